@@ -0,0 +1,285 @@
+"""
+Headless Benchmarks For Picev
+
+Builds synthetic image directories, drives App without a display and
+writes the results as JSON, so regressions can be caught between releases.
+
+    python benchmark.py --sizes 10 1000 10000 --output results.json
+
+With --http the datasets are served by a local http.server instead, to
+measure the HTTP source (listing, pooled fetches, response cache).
+"""
+
+import argparse
+import functools
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FORMATS = ('png', 'jpg', 'gif', 'bmp')
+RESOLUTIONS = ((640, 480), (1920, 1080), (4000, 3000))
+
+
+def make_dataset(directory, count):
+    """Fill directory with count images of mixed formats and resolutions
+
+    One file per (format, resolution) is rendered, the rest are hard links
+    to them (or copies where links are not supported).
+
+    Args:
+        directory (str): target directory, created if needed
+        count (int): number of images
+    """
+
+    from PIL import Image as PILImage  # pylint: disable=import-outside-toplevel
+
+    os.makedirs(directory, exist_ok=True)
+    sources = {}
+
+    for index in range(count):
+        ext = FORMATS[index % len(FORMATS)]
+        # Mostly small images, every 50th one is large
+        size = RESOLUTIONS[2] if index % 50 == 0 else RESOLUTIONS[index % 2]
+        path = os.path.join(directory, f'image_{index:06d}.{ext}')
+
+        if os.path.exists(path):
+            continue
+
+        source = sources.get((ext, size))
+
+        if source is None:
+            image = PILImage.radial_gradient('L').resize(size).convert('RGB')
+            image.save(path)
+            sources[(ext, size)] = path
+            continue
+
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+
+
+def percentiles(samples):
+    """Return p50/p90/p99/max of samples in milliseconds"""
+
+    if not samples:
+        return {}
+
+    ordered = sorted(samples)
+
+    def pick(ratio):
+        return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))] * 1000
+
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99),
+            'max': ordered[-1] * 1000, 'mean': statistics.mean(ordered) * 1000}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """
+    Keep-Alive File Server Handler Without Request Logging
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def serve(directory):
+    """Serve directory on a free local port from a background thread
+
+    Args:
+        directory (str): directory to serve
+
+    Returns:
+        ThreadingHTTPServer: the running server
+    """
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                 functools.partial(QuietHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def run_dataset(directory, steps):
+    """Benchmark App on directory (runs in its own process)
+
+    Args:
+        directory (str): synthetic image directory, or the URL serving it
+        steps (int): arrow-key navigation steps to time
+
+    Returns:
+        dict: results
+    """
+
+    url = directory.startswith(('http://', 'https://'))
+
+    if not url:
+        directory = os.path.realpath(directory)
+    sys.argv = ['main.py', '-i', directory]
+
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+    start = time.perf_counter()
+
+    # pylint: disable=import-outside-toplevel
+    from kivy.app import App as KivyApp
+    from kivy.clock import Clock
+
+    import main
+
+    import_time = time.perf_counter() - start
+
+    def pump(condition, timeout=60):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError('benchmark step timed out')
+            Clock.tick()
+
+    def shown(expected=None):
+        view, path = app.shown_view()
+        return path is not None and view.texture is not None \
+            and (expected is None or path == expected) and (path, False) in app.textures
+
+    def settle():
+        # Presses closer than settle_delay are taken as a held key
+        if app.nav_presses:
+            last_press = app.nav_presses[-1][0]
+            pump(lambda: time.perf_counter() - last_press > app.settle_delay)
+
+    app = main.App()
+    KivyApp._running_app = app  # pylint: disable=protected-access
+    pump(shown)
+    first_image = time.perf_counter() - start
+
+    scan_start = time.perf_counter()
+    if url:
+        scanned = len(main.http_source().listing(directory, app.scanner.pattern))
+    else:
+        scanned = sum(len(batch) for batch in app.scanner.scan(directory))
+    scan_time = time.perf_counter() - scan_start
+
+    navigation = []
+    for _step in range(min(steps, len(app.image_list) - 1)):
+        if app.current_image + 1 >= len(app.image_list):
+            break
+        expected = app.image_list[app.current_image + 1]
+        step_start = time.perf_counter()
+        app.on_keyboard(scancode=79)
+        pump(lambda expected=expected: shown(expected))
+        navigation.append(time.perf_counter() - step_start)
+        settle()
+
+    set_base_image = []
+    for index in range(0, len(app.image_list), max(1, len(app.image_list) // steps))[:steps]:
+        step_start = time.perf_counter()
+        app.current_image = index
+        app.set_base_image(app.image_list[index])
+        pump(lambda index=index: shown(app.image_list[index]))
+        set_base_image.append(time.perf_counter() - step_start)
+
+    toggles = []
+    for _toggle in range(4):
+        toggle_start = time.perf_counter()
+        app.toggle_carousel()
+        pump(shown)
+        toggles.append(time.perf_counter() - toggle_start)
+
+    app.on_stop()
+
+    return {
+        'directory': directory,
+        'images': scanned,
+        'import_ms': import_time * 1000,
+        'time_to_first_image_ms': first_image * 1000,
+        'scan_ms': scan_time * 1000,
+        'navigation_ms': percentiles(navigation),
+        'navigation_images_per_s': len(navigation) / sum(navigation) if navigation else None,
+        'set_base_image_ms': percentiles(set_base_image),
+        'toggle_carousel_ms': percentiles(toggles),
+        'texture_cache_hit_rate': app.textures.hit_rate(),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    """
+    Build the datasets and benchmark each one in a fresh process
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--steps', type=int, default=50, help='navigation steps per dataset')
+    parser.add_argument('--workdir', help='keep the datasets here instead of a temp directory')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--http', action='store_true',
+                        help='serve the datasets over a local http.server')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_dataset(args.run, args.steps)))
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='picev-bench-')
+    results = {'python': sys.version.split()[0], 'source': 'http' if args.http else 'disk',
+               'datasets': []}
+
+    for size in args.sizes:
+        directory = os.path.join(workdir, f'{size}')
+        make_dataset(directory, size)
+        server = None
+
+        # Cold thumbnail, metadata, tile and response caches for every dataset,
+        # never the user's own
+        cache = os.path.join(workdir, f'cache-{size}')
+        shutil.rmtree(cache, ignore_errors=True)
+        environment = dict(os.environ, XDG_CACHE_HOME=cache)
+
+        if args.http:
+            server = serve(directory)
+            target = f'http://127.0.0.1:{server.server_port}/'
+        else:
+            target = directory
+
+        process = subprocess.run([sys.executable, os.path.realpath(__file__),
+                                  '--run', target, '--steps', str(args.steps)],
+                                 capture_output=True, text=True, check=False, env=environment)
+
+        if server:
+            server.shutdown()
+            server.server_close()
+
+        if process.returncode:
+            results['datasets'].append({'images': size, 'error': process.stderr.strip()})
+        else:
+            results['datasets'].append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,850 @@
+"""
+Kivy-Free Image Access And On-Disk Caches
+
+Format sniffing, ZIP/CBZ archives, the HTTP directory-listing source,
+thumbnail and preview caches, and the shared-memory decoding used by the
+worker processes. Nothing here imports Kivy, so `python main.py
+--warm-cache DIR` can run on machines without a display.
+"""
+
+import fnmatch
+import hashlib
+import http.client
+import io
+import json
+import logging
+import mmap
+import optparse
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from multiprocessing import shared_memory
+from urllib.parse import unquote, urljoin, urlsplit
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+__all__ = ('SUPPORTED_IMAGES', 'SUPPORTED_EXTENSIONS', 'ARCHIVE_EXTENSIONS', 'PREVIEW_SIZE',
+           'image_pattern', 'sniff', 'MemberFile', 'Archive', 'is_archive', 'split_archive',
+           'HttpSource', 'http_source', 'is_url', 'open_image', 'open_unbounded', 'source_file',
+           'cache_path', 'evict', 'ThumbnailStore', 'preview_store', 'decode_shared',
+           'make_thumbnail', 'warm_cache', 'warm_cache_main')
+
+Logger = logging.getLogger('kivy')
+
+SUPPORTED_IMAGES = ('*.png', '*.jp*g', '*.bmp', '*.bpm', '*.ico', '*.gif', '*.xcf')
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.jpe', '.bmp', '.bpm', '.ico', '.gif', '.xcf')
+ARCHIVE_EXTENSIONS = ('.zip', '.cbz')
+PREVIEW_SIZE = (2048, 2048)
+
+# (magic bytes, format) checked against the start of the file
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'\x00\x00\x01\x00', 'ico'),
+    (b'gimp xcf', 'xcf'),
+)
+
+
+def image_pattern(patterns=SUPPORTED_IMAGES):
+    """Return one case-insensitive regex matching any of the glob patterns"""
+
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns),
+                      re.IGNORECASE)
+
+
+def sniff(path):
+    """Tell the format of path from its content
+
+    Reads the first and last bytes only, files of an unknown format and
+    PNG/GIF files missing their trailer are rejected. JPEGs are not checked
+    at the end, data often follows their EOI marker (Motion Photos, MPF
+    trailers, padding).
+
+    Args:
+        path (str): file to check
+
+    Returns:
+        tuple: (format, None) or (None, reason)
+    """
+
+    try:
+        with open(path, 'rb') as file:
+            head = file.read(16)
+            size = file.seek(0, os.SEEK_END)
+            file.seek(max(0, size - 64))
+            tail = file.read()
+    except OSError as error:
+        return None, error.strerror or str(error)
+
+    for magic, kind in SIGNATURES:
+        if head.startswith(magic):
+            break
+    else:
+        return None, 'unknown format'
+
+    if kind == 'png' and b'IEND' not in tail:
+        return None, 'truncated PNG'
+
+    if kind == 'gif' and b';' not in tail[-16:]:
+        return None, 'truncated GIF'
+
+    return kind, None
+
+
+class MemberFile(io.RawIOBase):
+    """
+    Read-Only File Over A memoryview, reads copy straight out of the mmap
+    """
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.view[self.position:self.position + len(buffer)]
+        buffer[:len(data)] = data
+        self.position += len(data)
+
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = (0, self.position, len(self.view))[whence]
+        self.position = max(0, base + offset)
+
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+class Archive:
+    """
+    ZIP/CBZ Archive Opened As A Read-Only Virtual Directory
+
+    Members are listed from the central directory without touching their
+    data. Stored members are read straight from an mmap of the archive,
+    deflated ones are inflated when opened. Images inside an archive have
+    virtual paths: the archive path, a separator and the member name.
+    """
+
+    _open = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+
+        with zipfile.ZipFile(path) as archive:
+            self.members = {info.filename: info for info in archive.infolist()
+                            if not info.is_dir()}
+
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def get(cls, path):
+        """Return the Archive of path, reopened if the file changed
+
+        Args:
+            path (str): absolute path of the archive
+        """
+
+        stat = os.stat(path)
+
+        with cls._lock:
+            version, archive = cls._open.get(path, (None, None))
+
+            if version != (stat.st_size, stat.st_mtime_ns):
+                archive = cls(path)
+                cls._open[path] = ((stat.st_size, stat.st_mtime_ns), archive)
+
+        return archive
+
+    def names(self, pattern):
+        """Return the member names matching pattern, hidden files excluded"""
+
+        names = []
+
+        for name in self.members:
+            base = name.rsplit('/', 1)[-1]
+            if not base.startswith('.') and pattern.match(base):
+                names.append(name)
+
+        return names
+
+    def read(self, name):
+        """Return the content of member name
+
+        Stored members are a memoryview of the mapped archive (no copy).
+
+        Args:
+            name (str): member name
+        """
+
+        info = self.members[name]
+
+        if info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED,
+                                                               zipfile.ZIP_DEFLATED):
+            # Encrypted or unusual compression, leave it to zipfile
+            with zipfile.ZipFile(self.path) as archive:
+                return archive.read(info)
+
+        offset = info.header_offset
+
+        if self.map[offset:offset + 4] != b'PK\x03\x04':
+            raise zipfile.BadZipFile(f'{self.path}: bad local header of {name}')
+
+        # The local extra field may differ from the central directory one
+        name_length, extra_length = struct.unpack_from('<HH', self.map, offset + 26)
+        start = offset + 30 + name_length + extra_length
+        data = memoryview(self.map)[start:start + info.compress_size]
+
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(data, -15, info.file_size or zlib.DEF_BUF_SIZE)
+
+        return data
+
+    def open(self, name):
+        """Return a binary file of member name"""
+
+        data = self.read(name)
+
+        return MemberFile(data) if isinstance(data, memoryview) else io.BytesIO(data)
+
+
+def is_archive(path):
+    """Return True if path is a ZIP/CBZ archive that can be opened as a directory"""
+
+    return path.lower().endswith(ARCHIVE_EXTENSIONS) and zipfile.is_zipfile(path)
+
+
+def split_archive(path):
+    """Split the virtual path of an archive member
+
+    Args:
+        path (str): path, possibly inside an archive
+
+    Returns:
+        tuple: (archive path, member name), or (None, None) for a regular path
+    """
+
+    lower = path.lower()
+
+    for ext in ARCHIVE_EXTENSIONS:
+        index = lower.find(ext + os.sep)
+
+        while index != -1:
+            archive = path[:index + len(ext)]
+
+            if os.path.isfile(archive):
+                return archive, path[len(archive) + 1:].replace(os.sep, '/')
+
+            index = lower.find(ext + os.sep, index + 1)
+
+    return None, None
+
+
+class _LinkParser(HTMLParser):
+    """Collect the href of every <a> of a directory listing"""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+
+class HttpSource:
+    """
+    Images Served By An HTTP Directory Listing
+
+    Requests go over a few keep-alive connections per host, shared by the
+    decode threads. Responses are kept on disk under self.directory and
+    revalidated with ETag / Last-Modified once per run, then served from
+    disk.
+    """
+
+    def __init__(self, directory=None, connections=4, timeout=30,
+                 max_bytes=1024 * 1024 * 1024):
+        self.directory = directory or cache_path('http')
+        self.connections = connections
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.idle = {}
+        self.fresh = set()
+        self.written = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def connect(self, scheme, host):
+        """Return an idle connection to host, or a new one"""
+
+        with self.lock:
+            idle = self.idle.get((scheme, host))
+            if idle:
+                return idle.pop()
+
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, timeout=self.timeout)
+
+        return http.client.HTTPConnection(host, timeout=self.timeout)
+
+    def release(self, scheme, host, connection):
+        """Keep connection for the next request to host, up to self.connections"""
+
+        with self.lock:
+            idle = self.idle.setdefault((scheme, host), [])
+
+            if len(idle) < self.connections:
+                idle.append(connection)
+                return
+
+        connection.close()
+
+    def request(self, url, headers=None):
+        """GET url over a pooled connection
+
+        Args:
+            url (str): http(s) URL
+            headers (dict, optional): request headers. Defaults to None.
+
+        Returns:
+            tuple: (status, response headers, body)
+        """
+
+        parts = urlsplit(url)
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+        for attempt in range(2):
+            connection = self.connect(parts.scheme, parts.netloc)
+
+            try:
+                connection.request('GET', target, headers=headers or {})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as error:
+                connection.close()
+                if attempt:
+                    raise OSError(f'{url}: {error}') from error
+                # The server may have closed an idle connection, retry on a new one
+                continue
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(parts.scheme, parts.netloc, connection)
+
+            return response.status, response.headers, body
+
+        return None
+
+    def cached(self, url):
+        """Return the cache file of the response of url, it may not exist yet"""
+
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        # Keep the extension, Kivy picks its loader from it
+        ext = os.path.splitext(urlsplit(url).path)[1].lower()[:8]
+
+        return os.path.join(self.directory, digest[:2], digest + ext)
+
+    def fetch(self, url):
+        """Return a local file holding the content of url (blocking)
+
+        Args:
+            url (str): http(s) URL of an image
+        """
+
+        cached = self.cached(url)
+
+        if url in self.fresh and os.path.isfile(cached):
+            return cached
+
+        headers = {}
+
+        if os.path.isfile(cached):
+            try:
+                with open(cached + '.json', encoding='utf-8') as file:
+                    validators = json.load(file)
+            except (OSError, ValueError):
+                validators = {}
+
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        status, response_headers, body = self.request(url, headers)
+
+        if status == 304 and headers:
+            self.fresh.add(url)
+            return cached
+
+        if status != 200:
+            raise OSError(f'{url}: HTTP {status}')
+
+        temporary = f'{cached}.{os.getpid()}.{threading.get_ident()}.tmp'
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+
+        with open(temporary, 'wb') as file:
+            file.write(body)
+        os.replace(temporary, cached)
+
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'url': url, 'etag': response_headers.get('ETag'),
+                       'last_modified': response_headers.get('Last-Modified')}, file)
+        os.replace(temporary, cached + '.json')
+
+        self.fresh.add(url)
+
+        with self.lock:
+            self.written += len(body)
+            written = self.written
+            if written > self.max_bytes // 16:
+                self.written = 0
+
+        if written > self.max_bytes // 16:
+            evict(self.directory, self.max_bytes)
+
+        return cached
+
+    def listing(self, url, pattern):
+        """Return the URLs of the images linked from the directory listing at url
+
+        Args:
+            url (str): URL of the listing
+            pattern (re.Pattern): matches the supported file names
+        """
+
+        status, _headers, body = self.request(url)
+
+        if status != 200:
+            raise OSError(f'{url}: HTTP {status}')
+
+        parser = _LinkParser()
+        parser.feed(body.decode('utf-8', 'replace'))
+
+        base = url if url.endswith('/') else url + '/'
+        urls = []
+
+        for href in parser.links:
+            link = urljoin(base, href).split('#', 1)[0].split('?', 1)[0]
+            name = unquote(link[len(base):])
+
+            # Parents, subdirectories and other hosts are not part of the listing
+            if not link.startswith(base) or not name or '/' in name:
+                continue
+            if name.startswith('.') or not pattern.match(name):
+                continue
+
+            urls.append(link)
+
+        return list(dict.fromkeys(urls))
+
+
+_HTTP = None
+_HTTP_LOCK = threading.Lock()
+
+
+def http_source():
+    """Return the HttpSource shared by this process"""
+
+    global _HTTP  # pylint: disable=global-statement
+
+    with _HTTP_LOCK:
+        if _HTTP is None:
+            _HTTP = HttpSource()
+
+    return _HTTP
+
+
+def is_url(path):
+    """Return True if path is an http(s) URL"""
+
+    return path.startswith(('http://', 'https://'))
+
+
+def source_file(path):
+    """Return the local file whose stat tells whether path changed
+
+    That is the archive of archive members and the cached response of URLs.
+    """
+
+    if is_url(path):
+        return http_source().cached(path)
+
+    return split_archive(path)[0] or path
+
+
+def open_image(path):
+    """Return what PILImage.open() takes for path
+
+    That is path itself, a file for archive members, or the cached
+    response of URLs (fetched if needed, so it may block).
+    """
+
+    if is_url(path):
+        return http_source().fetch(path)
+
+    archive, member = split_archive(path)
+
+    if archive is None:
+        return path
+
+    return Archive.get(archive).open(member)
+
+
+_PIXEL_LIMIT_LOCK = threading.Lock()
+
+
+def open_unbounded(path):
+    """PILImage.open() path without Pillow's decompression bomb limit
+
+    Only for local files TilePyramid never decodes whole. The limit is
+    lifted while the header is parsed, when Pillow checks it.
+    """
+
+    with _PIXEL_LIMIT_LOCK:
+        limit, PILImage.MAX_IMAGE_PIXELS = PILImage.MAX_IMAGE_PIXELS, None
+
+        try:
+            return PILImage.open(path)
+        finally:
+            PILImage.MAX_IMAGE_PIXELS = limit
+
+
+def cache_path(*parts):
+    """Return a path under the user cache directory of picev
+
+    Args:
+        *parts: path components below the cache directory
+    """
+
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                        'picev', *parts)
+
+
+class ThumbnailStore:
+    """
+    Persistent On-Disk Thumbnail Cache
+
+    Thumbnails are keyed by path, file size and mtime, stored as small
+    JPEG/PNG files under self.directory and evicted oldest-first once the
+    cache grows past max_bytes. Needs Pillow to generate thumbnails,
+    without it the original path is used.
+    """
+
+    def __init__(self, directory=None, size=(256, 256), max_bytes=256 * 1024 * 1024):
+        self.directory = directory or cache_path('thumbnails')
+        self.size = size
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, path):
+        """Return the cache file of path, or None if path can't be stat'ed
+
+        Args:
+            path (str): absolute path of the image
+        """
+
+        try:
+            stat = os.stat(source_file(path))
+        except OSError:
+            return None
+
+        digest = hashlib.sha1(
+            f'{path}:{stat.st_size}:{stat.st_mtime_ns}:{self.size}'.encode()).hexdigest()
+
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, path):
+        """Return the cached thumbnail of path, or None on a miss"""
+
+        key = self.key(path)
+
+        if key:
+            for cached in (key + '.jpg', key + '.png'):
+                if os.path.isfile(cached):
+                    return cached
+
+        return None
+
+    def make(self, path):
+        """Generate the thumbnail of path (runs in a worker)
+
+        Args:
+            path (str): absolute path of the image
+        """
+
+        cached = self.get(path)
+
+        if cached:
+            return cached
+
+        fallback = path
+
+        if is_url(path):
+            try:
+                # Keyed on the cached response, it must be fetched first
+                fallback = http_source().fetch(path)
+            except OSError as error:
+                Logger.warning(f'Thumbnail: {error}')
+                return path
+
+        key = self.key(path)
+
+        if PILImage is None or key is None:
+            return fallback
+
+        try:
+            with PILImage.open(open_image(path)) as image:
+                image.draft('RGB', self.size)
+                image.thumbnail(self.size)
+
+                if image.mode in ('RGBA', 'LA', 'P'):
+                    cached = key + '.png'
+                    image = image.convert('RGBA')
+                else:
+                    cached = key + '.jpg'
+                    image = image.convert('RGB')
+
+                os.makedirs(os.path.dirname(cached), exist_ok=True)
+                # Unique per thread, two workers may generate the same thumbnail
+                temporary = f'{cached}.{os.getpid()}.{threading.get_ident()}.tmp'
+                image.save(temporary, 'PNG' if cached.endswith('.png') else 'JPEG', quality=85)
+                os.replace(temporary, cached)
+        except Exception as error:  # pylint: disable=broad-except
+            Logger.warning(f'Thumbnail: {path}: {error}')
+            return fallback
+
+        with self.lock:
+            self.written += os.path.getsize(cached)
+            written = self.written
+
+        if written > self.max_bytes // 16:
+            self.evict()
+
+        return cached
+
+    def evict(self):
+        """
+        Remove the least recently written thumbnails until the cache fits max_bytes
+        """
+
+        with self.lock:
+            self.written = 0
+
+        evict(self.directory, self.max_bytes)
+
+
+def evict(directory, max_bytes, whole_directories=False):
+    """Remove the least recently written files of directory until it fits max_bytes
+
+    Args:
+        directory (str): cache directory
+        max_bytes (int): size to fit in
+        whole_directories (bool, optional): remove every subdirectory of
+            directory as one entry, as recent as its newest file. Defaults to False.
+    """
+
+    entries = {}
+    total = 0
+
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+
+            if whole_directories and root != directory:
+                entry = os.path.join(directory, os.path.relpath(root, directory).split(os.sep)[0])
+            else:
+                entry = os.path.join(root, name)
+
+            mtime, size = entries.get(entry, (0, 0))
+            entries[entry] = (max(mtime, stat.st_mtime), size + stat.st_size)
+            total += stat.st_size
+
+    for cached, (_mtime, size) in sorted(entries.items(), key=lambda entry: entry[1]):
+        if total <= max_bytes:
+            break
+        try:
+            if os.path.isdir(cached):
+                shutil.rmtree(cached)
+            else:
+                os.remove(cached)
+        except OSError:
+            continue
+        total -= size
+
+
+def preview_store():
+    """Return the store of display-resolution previews"""
+
+    return ThumbnailStore(cache_path('previews'), PREVIEW_SIZE, 2 * 1024 * 1024 * 1024)
+
+
+def decode_shared(source, size=None, preview=False):
+    """Decode source with Pillow into a new shared memory block (runs in a pool process)
+
+    The viewer uploads the pixels straight from the block, then unlinks it.
+
+    Args:
+        source (str): image file, or its preview
+        size (tuple, optional): fit into size with reduced-size decoding. Defaults to None.
+        preview (bool, optional): source is a preview of the image. Defaults to False.
+
+    Returns:
+        tuple: (block name, width, height, 'rgb' or 'rgba', True if reduced),
+            None if Pillow can't read source
+    """
+
+    try:
+        with PILImage.open(open_image(source)) as image:
+            native_size = image.size
+
+            if size:
+                image.draft(image.mode, size)
+                image.thumbnail(size)
+
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands()
+                                      or 'transparency' in image.info else 'RGB')
+
+            pixels = image.tobytes()
+            width, height = image.size
+            mode = image.mode.lower()
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(pixels)))
+    block.buf[:len(pixels)] = pixels
+    name = block.name
+    block.close()
+
+    return name, width, height, mode, preview or (width, height) != native_size
+
+
+_THUMBNAILS = {}
+
+
+def make_thumbnail(path, directory, size, max_bytes):
+    """Generate the thumbnail of path in the store at directory (runs in a pool process)"""
+
+    store = _THUMBNAILS.get(directory)
+
+    if store is None:
+        store = _THUMBNAILS[directory] = ThumbnailStore(directory, size, max_bytes)
+
+    return store.make(path)
+
+
+_STORES = None
+
+
+def _warm(path):
+    """Generate the thumbnail and the preview of path (runs in a pool process)"""
+
+    global _STORES  # pylint: disable=global-statement
+
+    if _STORES is None:
+        _STORES = (ThumbnailStore(), preview_store())
+
+    for store in _STORES:
+        store.make(path)
+
+    return path
+
+
+def warm_cache(directories, recursive=False, jobs=None):
+    """Pre-generate thumbnails and previews of every image in directories
+
+    Args:
+        directories (list): directories to warm
+        recursive (bool, optional): include subdirectories. Defaults to False.
+        jobs (int, optional): worker processes. Defaults to the CPU count.
+
+    Returns:
+        int: number of images processed
+    """
+
+    pattern = image_pattern()
+    paths = []
+
+    for directory in directories:
+        directory = os.path.realpath(directory)
+
+        for root, dirs, files in os.walk(directory):
+            paths += [os.path.join(root, name) for name in sorted(files)
+                      if not name.startswith('.') and pattern.match(name)]
+
+            if not recursive:
+                break
+
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        for done, _path in enumerate(pool.map(_warm, paths, chunksize=16), 1):
+            if done % 100 == 0:
+                Logger.info(f'Cache: {done}/{len(paths)} images')
+
+    Logger.info(f'Cache: warmed {len(paths)} images in {time.perf_counter() - start:.1f} s')
+
+    return len(paths)
+
+
+def warm_cache_main(argv):
+    """Command line entry of --warm-cache
+
+    Args:
+        argv (list): arguments without the program name
+
+    Returns:
+        int: exit status
+    """
+
+    parser = optparse.OptionParser(usage='%prog --warm-cache DIR [--recursive] [--jobs N]')
+    parser.add_option('--warm-cache', action='append', metavar='DIR', default=[],
+                      help='Generate thumbnails and previews of DIR, can be repeated')
+    parser.add_option('-r', '--recursive', action='store_true',
+                      help='Include subdirectories')
+    parser.add_option('-j', '--jobs', type='int', help='Worker processes (default: all cores)')
+    options = parser.parse_args(argv)[0]
+
+    if PILImage is None:
+        parser.error('--warm-cache needs Pillow')
+
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)-7s] %(message)s')
+
+    warm_cache(options.warm_cache, options.recursive, options.jobs)
+
+    return 0
@@ -2,20 +2,50 @@
 Simple Google's Material Design Photo Viewer
 """
 
-import glob
+import bisect
+import ctypes
+import ctypes.util
+import hashlib
+import io
+import json
+import math
+import multiprocessing
 import optparse
 import os
+import re
+import select
+import sqlite3
+import struct
 import sys
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial, wraps
+from multiprocessing import resource_tracker, shared_memory
+
+STARTED = time.perf_counter()
+
+if __name__ == '__main__' and any(arg == '--warm-cache' or arg.startswith('--warm-cache=')
+                                  for arg in sys.argv[1:]):
+    # Headless, must not open a window
+    from cache import warm_cache_main
+    sys.exit(warm_cache_main(sys.argv[1:]))
 
 import kivy
 kivy.require('1.10.1')
 
-from Xlib import display
 from kivy import Logger
 from kivy.animation import Animation, AnimationTransition
 from kivy.clock import Clock
+from kivy.core.image import ImageData, ImageLoader
 from kivy.core.window import Window
-from kivy.uix.carousel import Carousel
+from kivy.graphics import Color, Rectangle
+from kivy.graphics.opengl import GL_MAX_TEXTURE_SIZE, glGetIntegerv
+from kivy.graphics.texture import Texture
 from kivy.uix.image import Image
 from kivy.uix.scatterlayout import ScatterLayout
 from kivy.uix.screenmanager import Screen, ScreenManager
@@ -23,12 +53,17 @@ from kivy.uix.widget import Widget
 from kivy.utils import get_color_from_hex
 from kivymd.app import MDApp
 from kivymd.uix.button import MDIconButton
-from kivymd.uix.filemanager import MDFileManager
 from kivymd.uix.gridlayout import MDGridLayout
-from kivymd.uix.imagelist import SmartTileWithLabel as SmartTile
 from kivymd.uix.label import MDLabel
 
-__all__ = ('Spacer', 'App', 'app', '__app__', '__version__')
+from cache import (ARCHIVE_EXTENSIONS, PILImage, SUPPORTED_EXTENSIONS, SUPPORTED_IMAGES,
+                   Archive, ThumbnailStore, cache_path, decode_shared, evict, http_source,
+                   image_pattern, is_archive, is_url, make_thumbnail, open_image, open_unbounded,
+                   preview_store, sniff, split_archive)
+
+__all__ = ('Spacer', 'Tracer', 'tracer', 'Tile', 'DirectoryScanner', 'ImageList', 'DirectoryWatcher',
+           'TextureCache', 'DecodePool', 'ThumbnailCache', 'TilePyramid', 'TiledImage',
+           'GifStream', 'Slideshow', 'MetadataIndex', 'cache_path', 'App', 'app', '__app__', '__version__')
 __app__ = 'PICEV'
 __version__ = '0.2'
 
@@ -44,272 +79,2745 @@ class Spacer(Widget):
     size_hint = (1, 1)
 
 
-class App(MDApp):
+class Tracer:
     """
-    Main App Class
+    Opt-In Hot-Path Tracer
+
+    Records spans as Chrome trace events (chrome://tracing, Perfetto) while
+    enabled, and keeps the recent durations of every span for the perf
+    overlay while sampling. Does nothing until either is set.
     """
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
+    def __init__(self, max_events=1000000):
+        self.enabled = False
+        self.sampling = False
+        self.max_events = max_events
+        self.events = []
+        self.recent = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
 
-        self.props = {
-            'loading': None,
-            'notify': True,
-            'tile_toggled': None,
-            'tiles': [],
-            'transition': AnimationTransition.out_quad,
-            'transition_str': 'out_quad',
-            'bar_toggled': None,
-            'keep_bar_shown': None,
-            'cursor_leaved': None
-        }
+    @property
+    def active(self):
+        """Whether spans are timed at all"""
 
-        self.image = None
+        return self.enabled or self.sampling
 
-        self.icon = os.path.split(os.path.realpath(sys.argv[0]))[0] + f'/logo-{__app__.lower()}.png'
-        self.title = __app__
+    @contextmanager
+    def span(self, name, **args):
+        """Time the enclosed block as a span called name
 
-        self.loading_screen = Screen(name='loading_screen')
+        Args:
+            name (str): span name
+            **args: extra details shown with the span
+        """
 
-        self.global_screen = Screen()
-        self.screen_mgr = ScreenManager()
-        self.global_screen.add_widget(self.screen_mgr)
+        if not self.active:
+            yield
+            return
 
-        self.base_view = ScatterLayout()
-        self.old_win_size = Window.size
-        self.up_popup = MDGridLayout(cols=0, size_hint=(1, None))
-        self.up_popup.md_bg_color = self.theme_cls.primary_color
-        self.up_popup.pos = (self.up_popup.pos[0], Window.size[1])
-        self.up_popup.size = (self.up_popup.size[0], 100)
-        self.supported_images = ['*.png', '*.jp*g', '*.bpm', '*.ico', '*.gif', '*.xcf']
-        self.current_image = 0
-        self.image_list = []
-        self.bar_toggled = True
-        self.old_size = None
-        self.base_image = None
-        self.enable_carousel = None
-        self.carousel = Carousel(anim_type=self.props['transition_str'])
-        self.carousel.bind(current_slide=self.refresh_slide)
-        self.file_manager = MDFileManager(ext=['.png', '.jpeg', '.bpm', '.ico', '.gif', '.xcf'])
+        start = time.perf_counter()
 
-        Window.bind(on_keyboard=self.on_keyboard)
-        # Window.bind(size=self.on_resize)
-        Window.bind(on_cursor_leave=lambda dt: self.props.update({'cursor_leaved': True}))
-        Window.bind(on_cursor_enter=lambda dt: self.props.update({'cursor_leaved': False}))
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), args)
 
-        self.anim_duration = 0.2
+    def traced(self, name):
+        """Decorator timing every call of a function as a span called name"""
 
-        self.parser = optparse.OptionParser()
-        self.parser.add_option('-i', '--image', help='Show directly specified Image')
-        self.parser.add_option('-n', '--carousel', help='Disable Carousel Mode')
-        self.parser.add_option('-p', '--preload', help='Switch to simple view then carousel view')
-        self.shell_args = self.parser.parse_args()[0]
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.active:
+                    return function(*args, **kwargs)
 
-        self.enable_carousel = self.shell_args.carousel
+                with self.span(name):
+                    return function(*args, **kwargs)
 
-        if self.enable_carousel:
-            self.enable_carousel = int(self.enable_carousel)
+            return wrapper
 
-        self.view_screen = Screen(name='view_screen')
+        return decorator
+
+    def record(self, name, start, end, args=None):
+        """Add a finished span
+
+        Args:
+            name (str): span name
+            start (float): time.perf_counter() at the start
+            end (float): time.perf_counter() at the end
+            args (dict, optional): extra details. Defaults to None.
+        """
+
+        with self.lock:
+            if self.sampling:
+                self.recent.setdefault(name, deque(maxlen=32)).append((end - start) * 1000)
+
+            if not self.enabled or len(self.events) >= self.max_events:
+                return
+
+        event = {'name': name, 'cat': __app__.lower(), 'ph': 'X',
+                 'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6,
+                 'pid': os.getpid(), 'tid': threading.get_ident()}
+
+        if args:
+            event['args'] = args
+
+        with self.lock:
+            if len(self.events) < self.max_events:
+                self.events.append(event)
+
+    def average(self, name):
+        """Return the mean duration of the recent name spans in ms, or None"""
+
+        with self.lock:
+            recent = list(self.recent.get(name, ()))
+
+        return sum(recent) / len(recent) if recent else None
+
+    def save(self, path):
+        """Write the recorded spans as a Chrome trace-event JSON file
+
+        Args:
+            path (str): output file
+        """
+
+        with self.lock:
+            events = list(self.events)
+
+        with open(path, 'w', encoding='utf-8') as trace:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace)
+
+
+tracer = Tracer()
+
+
+_TILE_CLASS = None
+
+
+def tile_class():
+    """
+    Return the Tile class, kivymd's SmartTile is only imported on first use
+    """
+
+    global _TILE_CLASS  # pylint: disable=global-statement
+
+    if _TILE_CLASS is not None:
+        return _TILE_CLASS
+
+    # pylint: disable=import-outside-toplevel
+    from kivy.uix.recycleview.views import RecycleDataViewBehavior
+    from kivymd.uix.imagelist import SmartTileWithLabel as SmartTile
+
+    class Tile(RecycleDataViewBehavior, SmartTile):
+        """
+        Recycled Thumbnail Tile Used In The Tile Strip
+        """
+
+        index = None
+        image_path = ''
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+
+            self.font_style = 'Caption'  # Must be one of:
+            # ['H1', 'H2', 'H3', 'H4', 'H5',
+            # 'H6', 'Subtitle1', 'Subtitle2',
+            # 'Body1', 'Body2', 'Button',
+            # 'Caption', 'Overline', 'Icon']
+
+        def refresh_view_attrs(self, rv, index, data):
+            """Rebind the tile to self.image_list[index]
+
+            Args:
+                rv (RecycleView): the tile strip
+                index (int): index in self.image_list
+                data (dict): image_path and text of the tile
+            """
+
+            self.index = index
+            self.image_path = data['image_path']
+
+            thumbnails = MDApp.get_running_app().thumbnails
+            self.source = thumbnails.get(self.image_path) or ''
+
+            if not self.source:
+                thumbnails.request(self.image_path, partial(self._on_thumbnail, self.image_path))
+
+            return super().refresh_view_attrs(rv, index, data)
+
+        def _on_thumbnail(self, path, thumbnail):
+            """Set the thumbnail if the tile was not recycled meanwhile"""
+
+            if self.image_path == path:
+                self.source = thumbnail
+
+        def on_release(self, *args):
+            """Select the image of this tile"""
+
+            MDApp.get_running_app().set_from_tile(self)
+
+    _TILE_CLASS = Tile
+
+    return Tile
+
+
+def __getattr__(name):
+    if name == 'Tile':
+        return tile_class()
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+class DirectoryScanner:
+    """
+    Single-Pass Streaming Directory Scanner
+
+    Lists a directory once with os.scandir and matches every entry against
+    all the patterns at once (case-insensitive), yielding batches so the
+    first images can be shown before a large directory is fully listed.
+    """
+
+    def __init__(self, patterns, first_batch=64, batch=4096):
+        self.pattern = image_pattern(patterns)
+        self.first_batch = first_batch
+        self.batch = batch
+        self.scan_time = None
+
+    def scan(self, directory):
+        """Yield lists of matching file names in directory
+
+        Args:
+            directory (str): directory to list
+        """
+
+        start = time.perf_counter()
+        found = []
+        count = 0
+        batch = self.first_batch
+
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not self.pattern.match(entry.name):
+                    continue
+                if not entry.is_file():
+                    continue
+
+                found.append(entry.name)
+
+                if len(found) >= batch:
+                    count += len(found)
+                    yield found
+                    found = []
+                    batch = self.batch
+
+        if found:
+            count += len(found)
+            yield found
+
+        self.scan_time = time.perf_counter() - start
+
+        Logger.info(f'Scan: {count} images in {directory} ({self.scan_time * 1000:.1f} ms)')
+
+
+class ImageList:
+    """
+    Indexed List Of Image Paths
+
+    Entries are absolute paths under self.root (a directory, a ZIP/CBZ
+    archive whose members have virtual paths, or an HTTP directory listing
+    whose entries are URLs). A path -> index map makes
+    lookups O(1) and the natural sort key of every path is computed once,
+    so while the list is in name order new files are placed with bisect.
+    Tiles and Carousel slides carry their own index (Tile.index,
+    slide.slide_index), so widgets never need a lookup.
+    """
+
+    DIGITS = re.compile(r'(\d+)')
+
+    def __init__(self, root=None, paths=()):
+        self.root = root
+        self.paths = []
+        self.positions = {}
+        self.keys = {}
+        # Natural keys parallel to self.paths, only while sorted by name
+        self.order = []
+        self.by_name = True
+
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __getitem__(self, index):
+        return self.paths[index]
+
+    def __contains__(self, path):
+        return path in self.positions
+
+    def key(self, path):
+        """Return the natural sort key of path ('img2' before 'img10')"""
+
+        key = self.keys.get(path)
+
+        if key is None:
+            # Relative to the root, archive members may sit in subdirectories
+            name = path[len(self.root) + 1:] if self.root else os.path.basename(path)
+            # Text and numbers alternate, so the parts always compare like with like
+            parts = self.DIGITS.split(name.lower())
+            key = self.keys[path] = (tuple(int(part) if index % 2 else part
+                                           for index, part in enumerate(parts)), name)
+
+        return key
+
+    def index(self, path):
+        """Return the index of path, raises KeyError if it is not listed"""
+
+        return self.positions[path]
+
+    def get(self, path, default=None):
+        """Return the index of path, or default if it is not listed"""
+
+        return self.positions.get(path, default)
+
+    def extend(self, paths):
+        """Add the paths that are not listed yet
+
+        Args:
+            paths (list): absolute paths
+
+        Returns:
+            int: first index that changed, len(self) if none did
+        """
+
+        start = len(self.paths)
+        added = [path for path in dict.fromkeys(paths) if path not in self.positions]
+        self.paths += added
+
+        if self.by_name and added:
+            self.paths.sort(key=self.key)
+            self.order = [self.keys[path] for path in self.paths]
+            self.reindex()
+            return min(self.positions[path] for path in added)
+
+        self.reindex(start)
+        return start
+
+    def insert(self, path):
+        """Add path at its place (last unless sorted by name)
+
+        Args:
+            path (str): absolute path
+
+        Returns:
+            int: index of path, or None if it was already listed
+        """
+
+        if path in self.positions:
+            return None
+
+        if self.by_name:
+            key = self.key(path)
+            index = bisect.bisect_left(self.order, key)
+            self.order.insert(index, key)
+        else:
+            # Not indexed yet, goes last until the next sort
+            index = len(self.paths)
+
+        self.paths.insert(index, path)
+        self.reindex(index)
+
+        return index
+
+    def remove(self, path):
+        """Remove path
+
+        Args:
+            path (str): absolute path
+
+        Returns:
+            int: former index of path, or None if it was not listed
+        """
+
+        index = self.positions.pop(path, None)
+
+        if index is None:
+            return None
+
+        del self.paths[index]
+        if self.by_name:
+            del self.order[index]
+        self.keys.pop(path, None)
+        self.reindex(index)
+
+        return index
+
+    def sort(self, keys=None, reverse=False):
+        """Sort the list
+
+        Args:
+            keys (dict, optional): {path: sort key}. Defaults to natural name order.
+            reverse (bool, optional): descending order. Defaults to False.
+        """
+
+        self.paths.sort(key=self.key if keys is None else keys.__getitem__, reverse=reverse)
+        self.by_name = keys is None and not reverse
+        self.order = [self.keys[path] for path in self.paths] if self.by_name else []
+
+        self.reindex()
+
+    def reindex(self, start=0):
+        """Refresh the path -> index map from start on"""
+
+        positions = self.positions
+
+        for index in range(start, len(self.paths)):
+            positions[self.paths[index]] = index
+
+
+class DirectoryWatcher:
+    """
+    Linux inotify Watcher For The Opened Directory
+
+    Events are read on a background thread and handed to
+    callback(directory, events) on the main thread, events being a list of
+    (mask, name) tuples.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    ADDED = IN_CLOSE_WRITE | IN_MOVED_TO
+    REMOVED = IN_DELETE | IN_MOVED_FROM
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = None
+        self.stop_pipe = None
+        self.thread = None
+
+    def watch(self, directory):
+        """Watch directory instead of the previously watched one
+
+        Args:
+            directory (str): directory to watch
+        """
+
+        self.stop()
+
+        fd = self.libc.inotify_init1(os.O_CLOEXEC)
+
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        if self.libc.inotify_add_watch(fd, os.fsencode(directory), self.ADDED | self.REMOVED) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f'inotify_add_watch failed for {directory}')
+
+        self.fd = fd
+        self.stop_pipe = os.pipe()
+        self.thread = threading.Thread(target=self._read, args=(directory, fd, self.stop_pipe[0]),
+                                       name='picev-watch', daemon=True)
+        self.thread.start()
+
+    def _read(self, directory, fd, stop_fd):
+        """Read inotify events until stopped (runs in the watch thread)"""
+
+        while True:
+            readable = select.select([fd, stop_fd], [], [])[0]
+
+            if stop_fd in readable:
+                break
+
+            buffer = os.read(fd, 64 * 1024)
+            events = []
+            offset = 0
+
+            while offset < len(buffer):
+                _wd, mask, _cookie, length = self.EVENT.unpack_from(buffer, offset)
+                offset += self.EVENT.size
+                name = buffer[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((mask, os.fsdecode(name)))
+
+            if events:
+                Clock.schedule_once(lambda dt, events=events: self.callback(directory, events))
+
+        os.close(fd)
+        os.close(stop_fd)
+
+    def stop(self):
+        """
+        Stop watching
+        """
+
+        if self.thread:
+            os.write(self.stop_pipe[1], b'\0')
+            self.thread.join()
+            os.close(self.stop_pipe[1])
+            self.thread = None
+            self.fd = None
+
+
+class TextureCache:
+    """
+    Memory-Budgeted LRU Cache Of Decoded Textures
+
+    Shared by the simple view and the Carousel, so flipping modes or going
+    back to a recently viewed image never hits the decoder.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.textures = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.textures
+
+    def __len__(self):
+        return len(self.textures)
+
+    @staticmethod
+    def texture_bytes(texture):
+        """Return the (RGBA) memory size of texture"""
+
+        width, height = texture.size
+
+        return width * height * 4
+
+    def get(self, key):
+        """Return the texture of key and mark it as recently used, or None"""
+
+        texture = self.textures.get(key)
+
+        if texture is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.textures.move_to_end(key)
+
+        return texture
+
+    def put(self, key, texture):
+        """Add texture, evicting the least recently used ones over budget
+
+        Args:
+            key (str): cache key (image path)
+            texture (Texture): decoded texture
+        """
+
+        self.discard(key)
+
+        self.textures[key] = texture
+        self.bytes += self.texture_bytes(texture)
+
+        while self.bytes > self.max_bytes and len(self.textures) > 1:
+            _key, evicted = self.textures.popitem(last=False)
+            self.bytes -= self.texture_bytes(evicted)
+
+    def discard(self, key):
+        """Drop the texture of key if it is cached"""
+
+        texture = self.textures.pop(key, None)
+
+        if texture is not None:
+            self.bytes -= self.texture_bytes(texture)
+
+    def hit_rate(self):
+        """Return the ratio of hits to lookups"""
+
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+
+class DecodePool:
+    """
+    Decode Images On Worker Threads and hand the textures back through Clock
+
+    Decoded textures go to a TextureCache, prefetching the neighbors of the
+    current image makes moving to an adjacent image an instant swap.
+
+    Images are decoded to fit self.display_size first (with reduced-size
+    JPEG decoding when Pillow is available, or from a preview written by
+    --warm-cache), the paths in self.reduced can be decoded again at full
+    resolution with request(full=True).
+
+    After start_processes() Pillow decodes run in worker processes and the
+    pixels come back through shared memory, uploaded without a copy. Files
+    Pillow can't read, or a dead pool, fall back to the in-process path.
+    """
+
+    def __init__(self, cache, workers=None, prefetch=2, display_size=None, previews=None,
+                 on_error=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.prefetch_count = prefetch
+        self.display_size = display_size
+        self.previews = previews
+        self.on_error = on_error
+        self.kinds = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                           thread_name_prefix='picev-decode')
+        self.cache = cache
+        self.reduced = set()
+        self.pending = {}
+        self.futures = {}
+        self.processes = None
+        # Threads waiting on self.processes, one per worker process
+        self.bridge = None
+        self.blocks = {}
+        self.lock = threading.Lock()
+
+    def start_processes(self, count):
+        """Decode in count worker processes from now on
+
+        Args:
+            count (int): number of processes
+
+        Returns:
+            bool: False if decoding stays in-process
+        """
+
+        if PILImage is None:
+            Logger.warning('Decode: worker processes need Pillow, decoding in-process')
+            return False
+
+        try:
+            # Workers share the tracker of the shared memory blocks, it must outlive them
+            resource_tracker.ensure_running()
+            # Forked right away, before any decode thread exists
+            self.processes = ProcessPoolExecutor(max_workers=count,
+                                                 mp_context=multiprocessing.get_context('fork'))
+            self.processes.submit(os.getpid)
+        except (OSError, ValueError) as error:
+            Logger.warning(f'Decode: no worker processes ({error}), decoding in-process')
+            self.processes = None
+            return False
+
+        self.bridge = ThreadPoolExecutor(max_workers=count, thread_name_prefix='picev-decode-proc')
+        Logger.info(f'Decode: {count} worker processes')
+
+        return True
+
+    def decode(self, path, full=False):
+        """Decode path to ImageData (runs in a worker thread)
+
+        Args:
+            path (str): absolute path of the image
+            full (bool, optional): ignore self.display_size. Defaults to False.
+
+        Returns:
+            tuple: (ImageData, True if it is smaller than the image)
+        """
+
+        with tracer.span('decode', path=path, full=full):
+            if self.processes:
+                decoded = self._decode_shared(path, full)
+                if decoded:
+                    return decoded
+
+            return self._decode(path, full)
+
+    def _decode_shared(self, path, full):
+        """Decode path in a worker process, see decode()
+
+        Returns:
+            tuple: (ImageData over a shared memory block, reduced), or None
+        """
+
+        source, size = path, None
+
+        if not full and self.display_size:
+            size = tuple(self.display_size)
+
+            if self.previews and max(size) <= min(self.previews.size):
+                source = self.previews.get(path) or path
+
+        try:
+            shared = self.processes.submit(decode_shared, source, size, source != path).result()
+        except (BrokenProcessPool, RuntimeError) as error:
+            Logger.warning(f'Decode: worker processes stopped ({error}), decoding in-process')
+            self.processes = None
+            return None
+        except OSError as error:
+            # No room for the block (full /dev/shm), the image itself is fine
+            Logger.warning(f'Decode: {path}: {error}, decoding in-process')
+            return None
+
+        if shared is None:
+            return None
+
+        name, width, height, mode, reduced = shared
+        block = shared_memory.SharedMemory(name=name)
+        view = block.buf[:width * height * len(mode)]
+
+        with self.lock:
+            self.blocks[(path, full)] = (block, view)
+
+        return ImageData(width, height, mode, view), reduced
+
+    @staticmethod
+    def release(block, view):
+        """Free a shared memory block once its pixels are uploaded"""
+
+        try:
+            view.release()
+            block.close()
+        except BufferError:
+            pass  # Still referenced, unmapped with the last reference
+
+        block.unlink()
+
+    def _decode(self, path, full):
+        """Decode path, see decode()"""
+
+        if PILImage is not None and not full and self.display_size:
+            source = path
+
+            if self.previews and max(self.display_size) <= min(self.previews.size):
+                source = self.previews.get(path) or path
+
+            try:
+                with PILImage.open(open_image(source)) as image:
+                    native_size = image.size if source == path else None
+                    image.draft(image.mode, tuple(self.display_size))
+                    image.thumbnail(tuple(self.display_size))
+
+                    if image.mode not in ('RGB', 'RGBA'):
+                        image = image.convert('RGBA' if 'A' in image.getbands()
+                                              or 'transparency' in image.info else 'RGB')
+
+                    data = ImageData(image.size[0], image.size[1],
+                                     image.mode.lower(), image.tobytes())
+
+                    return data, image.size != native_size
+            except Exception:  # pylint: disable=broad-except
+                pass  # Not a Pillow format, let Kivy decode it
+
+        kind = self.kinds.get(path)
+        archive, member = split_archive(path)
+
+        if archive:
+            kind = kind or os.path.splitext(member)[1][1:].lower()
+            loader = ImageLoader.load(f'__inline__.{kind}',
+                                      rawdata=io.BytesIO(Archive.get(archive).read(member)),
+                                      inline=True, keep_data=True, nocache=True)
+        elif kind:
+            # Mislabeled file, let Kivy pick the loader from the content
+            with open(path, 'rb') as file:
+                loader = ImageLoader.load(f'__inline__.{kind}', rawdata=io.BytesIO(file.read()),
+                                          inline=True, keep_data=True, nocache=True)
+        else:
+            # URLs load from their cached response
+            loader = ImageLoader.load(open_image(path), keep_data=True, nocache=True)
+
+        return loader._data[0], False
+
+    def get(self, path, full=False):
+        """Return the cached texture of path, or None"""
+
+        return self.cache.get((path, full))
+
+    def request(self, path, callback=None, full=False):
+        """Decode path in the background
+
+        Args:
+            path (str): absolute path of the image
+            callback (callable, optional): called as callback(path, texture)
+                on the main thread. Defaults to None.
+            full (bool, optional): decode at full resolution. Defaults to False.
+        """
+
+        key = (path, full)
+        texture = self.cache.get(key)
+
+        if texture is not None:
+            if callback:
+                callback(path, texture)
+            return
+
+        with self.lock:
+            callbacks = self.pending.get(key)
+
+            if callbacks is not None:
+                if callback:
+                    callbacks.append(callback)
+                return
+
+            self.pending[key] = [callback] if callback else []
+
+            executor = self.bridge if self.processes else self.executor
+            future = self.futures[key] = executor.submit(self.decode, path, full)
+
+        future.add_done_callback(
+            lambda future, key=key: Clock.schedule_once(
+                lambda dt: self._finish(key, future)))
+
+    def _finish(self, key, future):
+        """Upload decoded data to a texture (runs on the main thread)"""
+
+        if future.cancelled():
+            return
+
+        path = key[0]
+
+        with self.lock:
+            callbacks = self.pending.pop(key, [])
+            if self.futures.get(key) is future:
+                del self.futures[key]
+            shared = self.blocks.pop(key, None)
+
+        try:
+            data, reduced = future.result()
+            with tracer.span('upload', path=path):
+                texture = Texture.create_from_data(data)
+        except Exception as error:  # pylint: disable=broad-except
+            Logger.warning(f'Decode: {path}: {error}')
+            if self.on_error:
+                self.on_error(path, error)
+            return
+        finally:
+            if shared:
+                self.release(*shared)
+
+        if reduced:
+            self.reduced.add(path)
+
+        self.cache.put(key, texture)
+
+        for callback in callbacks:
+            callback(path, texture)
+
+    def prefetch(self, paths):
+        """Decode paths ahead of time
+
+        Args:
+            paths (list): absolute paths to have ready
+        """
+
+        for path in paths:
+            if (path, False) not in self.cache:
+                self.request(path)
+
+    def cancel(self, keep=()):
+        """Drop the queued decodes of every path not in keep
+
+        Decodes already running are left to finish (and be cached).
+
+        Args:
+            keep (set, optional): absolute paths still wanted. Defaults to ().
+
+        Returns:
+            int: number of cancelled decodes
+        """
+
+        cancelled = 0
+
+        with self.lock:
+            for key, future in list(self.futures.items()):
+                if key[0] not in keep and future.cancel():
+                    del self.futures[key]
+                    self.pending.pop(key, None)
+                    cancelled += 1
+
+        return cancelled
+
+    def discard(self, path):
+        """Forget every decoded texture of path"""
+
+        self.cache.discard((path, False))
+        self.cache.discard((path, True))
+        self.reduced.discard(path)
+
+    def shutdown(self):
+        """Stop the worker threads and processes"""
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+        if self.bridge:
+            self.bridge.shutdown(wait=False, cancel_futures=True)
+
+        if self.processes:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+
+
+class ThumbnailCache(ThumbnailStore):
+    """
+    Persistent On-Disk Thumbnail Cache, generating on the decode workers
+
+    Generates in self.processes instead when the decoder has worker processes.
+    Requests for a path already being generated share its result.
+    """
+
+    def __init__(self, executor, processes=None, **kwargs):
+        super().__init__(**kwargs)
+
+        self.executor = executor
+        self.processes = processes
+        self.pending = {}
+
+    def request(self, path, callback):
+        """Get the thumbnail of path in the background
+
+        Args:
+            path (str): absolute path of the image
+            callback (callable): called as callback(thumbnail) on the main thread
+        """
+
+        callbacks = self.pending.get(path)
+
+        if callbacks is not None:
+            callbacks.append(callback)
+            return
+
+        self.pending[path] = [callback]
+        future = None
+
+        if self.processes:
+            try:
+                future = self.processes.submit(make_thumbnail, path, self.directory,
+                                               self.size, self.max_bytes)
+            except (BrokenProcessPool, RuntimeError):
+                self.processes = None
+
+        if future is None:
+            future = self.executor.submit(self.make, path)
+
+        future.add_done_callback(
+            lambda future: Clock.schedule_once(lambda dt: self._finish(path, future)))
+
+    def _finish(self, path, future):
+        """Hand the thumbnail to every caller waiting for it (runs on the main thread)"""
+
+        thumbnail = path if future.exception() else future.result()
+
+        for callback in self.pending.pop(path, []):
+            callback(thumbnail)
+
+
+class TilePyramid:
+    """
+    Multi-Resolution Tile Pyramid Of A Large Image
+
+    Level 0 is the full resolution and every next level halves it, down to
+    a level that fits in a single tile. Tiles are written once under
+    self.directory, keyed by path, file size and mtime like ThumbnailCache,
+    the least recently built pyramids are evicted past max_bytes.
+
+    The source is decoded whole once, so it must fit max_pixels. Larger
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale and their pyramid starts at
+    first_level, other formats are refused with a ValueError.
+    """
+
+    tile_size = 512
+    max_bytes = 4 * 1024 * 1024 * 1024
+    max_pixels = 128 * 1000 * 1000
+
+    def __init__(self, path, size, directory, scalable=False):
+        self.path = path
+        self.size = size
+        self.levels = 1
+        self.first_level = 0
+        self.building = False
+
+        while max(size) > self.tile_size << (self.levels - 1):
+            self.levels += 1
+
+        while math.prod(self.level_size(self.first_level)) > self.max_pixels:
+            self.first_level += 1
+
+        if self.first_level > (3 if scalable else 0):
+            raise ValueError(f'{size[0]}x{size[1]} is too large to decode for tiling')
+
+        stat = os.stat(path)
+        digest = hashlib.sha1(
+            f'{path}:{stat.st_size}:{stat.st_mtime_ns}:{self.tile_size}'.encode()).hexdigest()
+
+        self.directory = os.path.join(directory, digest)
+        self.marker = os.path.join(self.directory, 'done')
+        self.ext = None
+
+    @property
+    def built(self):
+        """True once every tile is on disk"""
+
+        if self.ext is None and os.path.isfile(self.marker):
+            with open(self.marker, encoding='ascii') as marker:
+                self.ext = marker.read().strip()
+
+        return self.ext is not None
+
+    def level_size(self, level):
+        """Return the image size at level"""
+
+        return tuple(math.ceil(side / (1 << level)) for side in self.size)
+
+    def grid(self, level):
+        """Return the (columns, rows) count of tiles at level"""
+
+        return tuple(math.ceil(side / self.tile_size) for side in self.level_size(level))
+
+    def tile_file(self, level, col, row):
+        """Return the cache file of a tile"""
+
+        return os.path.join(self.directory, str(level), f'{col}_{row}.{self.ext}')
+
+    def build(self):
+        """
+        Write the tiles of every level, one strip of tile rows at a time (runs in a worker thread)
+
+        The source is decoded whole (Pillow can't decode JPEG or PNG by
+        regions, hence max_pixels), then first_level is cut from it in
+        strips and every next level is reduced from the strips of the
+        previous one, instead of from whole copies of the image.
+        """
+
+        first = self.first_level
+
+        with open_unbounded(self.path) as source:
+            if first:
+                # libjpeg scales while decoding, to ceil(side / 2 ** first)
+                source.draft(source.mode, tuple(side >> first for side in self.size))
+
+                if source.size != self.level_size(first):
+                    raise ValueError(f'could not decode at 1/{1 << first} scale')
+
+            alpha = 'A' in source.getbands() or 'transparency' in source.info
+            mode = 'RGBA' if alpha else 'RGB'
+            self.ext = 'png' if alpha else 'jpg'
+
+            for level in range(first, self.levels):
+                os.makedirs(os.path.join(self.directory, str(level)), exist_ok=True)
+
+            pending = [None] * self.levels
+            width, height = source.size
+            rows = self.grid(first)[1]
+
+            for row in range(rows):
+                top = row * self.tile_size
+                strip = source.crop((0, top, width, min(top + self.tile_size, height)))
+                self.write_strip(first, row, strip.convert(mode), row + 1 == rows, pending)
+
+        with open(self.marker, 'w', encoding='ascii') as marker:
+            marker.write(self.ext)
+
+        # Whole pyramids only, a partly evicted one would look built
+        evict(os.path.dirname(self.directory), self.max_bytes, whole_directories=True)
+
+    def write_strip(self, level, row, strip, last, pending):
+        """Write one strip of tiles and pass it on, halved, to the next level
+
+        Args:
+            level (int): level of strip
+            row (int): tile row of strip in level
+            strip (PIL.Image.Image): tile_size high (less for the last row)
+            last (bool): strip is the last row of level
+            pending (list): per level, the upper half of a strip waiting for its lower half
+        """
+
+        size = self.tile_size
+
+        for col in range(math.ceil(strip.width / size)):
+            tile = strip.crop((col * size, 0, min((col + 1) * size, strip.width), strip.height))
+            tile.save(self.tile_file(level, col, row), quality=90)
+
+        if level + 1 == self.levels:
+            return
+
+        half = strip.reduce(2)
+
+        if row % 2 == 0:
+            if not last:
+                pending[level + 1] = half
+                return
+            strip = half
+        else:
+            upper = pending[level + 1]
+            pending[level + 1] = None
+            strip = PILImage.new(half.mode, (half.width, upper.height + half.height))
+            strip.paste(upper, (0, 0))
+            strip.paste(half, (0, upper.height))
+
+        self.write_strip(level + 1, row // 2, strip, last, pending)
+
+
+class TiledImage(Widget):
+    """
+    Tiled Renderer For Images Too Large For A Single Texture
+
+    Draws the coarsest level as a backdrop, then only the tiles of the
+    level matching the current zoom that intersect the window.
+    """
+
+    def __init__(self, decoder, **kwargs):
+        super().__init__(**kwargs)
+
+        self.decoder = decoder
+        self.pyramid = None
+        self.redraw = Clock.create_trigger(self.draw)
+
+        self.bind(pos=self.redraw, size=self.redraw)
+
+    def show(self, pyramid):
+        """Show pyramid, building its tiles in the background if needed
+
+        Args:
+            pyramid (TilePyramid): image to show
+        """
+
+        self.pyramid = pyramid
+
+        if not pyramid.built and not pyramid.building:
+            pyramid.building = True
+            future = self.decoder.executor.submit(pyramid.build)
+            future.add_done_callback(
+                lambda future: Clock.schedule_once(partial(self._on_built, pyramid, future)))
+
+        self.redraw()
+
+    def _on_built(self, pyramid, future, dt=None):
+        """Draw pyramid once its tiles are written"""
+
+        del dt
+
+        pyramid.building = False
+
+        try:
+            future.result()
+        except Exception as error:  # pylint: disable=broad-except
+            Logger.warning(f'Tiles: {pyramid.path}: {error}')
+            return
+
+        if pyramid is self.pyramid:
+            self.redraw()
+
+    def fit(self):
+        """Return (x, y, scale) mapping level 0 pixels into the widget"""
+
+        width, height = self.pyramid.size
+        scale = min(self.width / width, self.height / height)
+
+        return (self.x + (self.width - width * scale) / 2,
+                self.y + (self.height - height * scale) / 2,
+                scale)
+
+    def draw(self, *args):
+        """
+        Draw the tiles intersecting the window at the current scale
+        """
+
+        del args
+
+        self.canvas.clear()
+        pyramid = self.pyramid
+
+        if pyramid is None or not pyramid.built or not self.width or not self.height:
+            return
+
+        width, height = pyramid.size
+        origin_x, origin_y, fit = self.fit()
+
+        # Window corners in level 0 pixels, through the scatter transform
+        corners = [self.to_widget(x, y) for x in (0, Window.width) for y in (0, Window.height)]
+        xs = [(x - origin_x) / fit for x, _y in corners]
+        ys = [height - (y - origin_y) / fit for _x, y in corners]
+        left, right = max(0, min(xs)), min(width, max(xs))
+        top, bottom = max(0, min(ys)), min(height, max(ys))
+
+        # Window pixels per level 0 pixel
+        start_x, start_y = self.to_window(0, 0)
+        end_x, end_y = self.to_window(1, 0)
+        screen = fit * math.hypot(end_x - start_x, end_y - start_y)
+
+        level = pyramid.first_level
+        while level + 1 < pyramid.levels and screen * (1 << (level + 1)) <= 1:
+            level += 1
+
+        span = pyramid.tile_size << level
+        cols, rows = pyramid.grid(level)
+
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.draw_tile(pyramid.levels - 1, 0, 0, origin_x, origin_y, fit)
+
+            if right > left and bottom > top:
+                for row in range(int(top // span), min(rows, int(bottom // span) + 1)):
+                    for col in range(int(left // span), min(cols, int(right // span) + 1)):
+                        self.draw_tile(level, col, row, origin_x, origin_y, fit)
+
+    def draw_tile(self, level, col, row, origin_x, origin_y, fit):
+        """Draw one tile, or request it and redraw once it is decoded"""
+
+        pyramid = self.pyramid
+        tile_file = pyramid.tile_file(level, col, row)
+        texture = self.decoder.get(tile_file)
+
+        if texture is None:
+            self.decoder.request(tile_file, lambda path, texture: self.redraw())
+            return
+
+        span = pyramid.tile_size << level
+        tile_width = texture.width << level
+        tile_height = texture.height << level
+
+        Rectangle(texture=texture,
+                  pos=(origin_x + col * span * fit,
+                       origin_y + (pyramid.size[1] - row * span - tile_height) * fit),
+                  size=(tile_width * fit, tile_height * fit))
+
+
+class GifStream:
+    """
+    Frame-On-Demand Playback Of An Animated GIF
+
+    Frames are decoded on a worker thread into a small ring buffer ahead
+    of the shown frame and blitted into a single texture, instead of
+    decoding every frame up front.
+    """
+
+    def __init__(self, path, widget, executor, buffer=4):
+        self.path = path
+        self.widget = widget
+        self.executor = executor
+        self.buffer = buffer
+        self.frames = deque()
+        self.lock = threading.Lock()
+        self.filling = False
+        self.playing = False
+        self.source = None
+        self.frame = 0
+        self.texture = None
+        self.event = None
+
+    def play(self):
+        """
+        Start decoding and showing frames
+        """
+
+        self.playing = True
+        self._fill_async()
+
+    def stop(self):
+        """
+        Stop playback, the widget keeps the last shown frame
+        """
+
+        self.playing = False
+
+        if self.event:
+            self.event.cancel()
+            self.event = None
+
+        with self.lock:
+            if not self.filling and self.source:
+                self.source.close()
+                self.source = None
+
+    def _fill_async(self):
+        """Refill the frame buffer on a worker thread"""
+
+        with self.lock:
+            if self.filling or not self.playing:
+                return
+            self.filling = True
+
+        future = self.executor.submit(self._fill)
+        future.add_done_callback(lambda future: Clock.schedule_once(self._on_filled))
+
+    def _fill(self):
+        """Decode frames until the buffer is full (runs in a worker thread)"""
+
+        try:
+            if self.source is None:
+                self.source = PILImage.open(open_image(self.path))
+
+            if getattr(self.source, 'n_frames', 1) < 2:
+                # Not animated, the static decode is all there is
+                self.playing = False
+
+            while self.playing and len(self.frames) < self.buffer:
+                self.source.seek(self.frame)
+                duration = self.source.info.get('duration') or 100
+                frame = self.source.convert('RGBA')
+                self.frames.append((frame.tobytes(), frame.size, max(duration, 20) / 1000))
+                self.frame = (self.frame + 1) % self.source.n_frames
+        except Exception as error:  # pylint: disable=broad-except
+            Logger.warning(f'Animation: {self.path}: {error}')
+            self.playing = False
+
+        with self.lock:
+            self.filling = False
+            if not self.playing and self.source:
+                self.source.close()
+                self.source = None
+
+    def _on_filled(self, dt=None):
+        """Start showing frames once the first ones are decoded"""
+
+        del dt
+
+        if self.playing and self.event is None:
+            self._show_next()
+
+    def _show_next(self, dt=None):
+        """Show the next buffered frame and schedule the one after"""
+
+        del dt
+
+        self.event = None
+
+        if not self.playing:
+            return
+
+        if self.frames:
+            data, size, duration = self.frames.popleft()
+
+            if self.texture is None or tuple(self.texture.size) != size:
+                self.texture = Texture.create(size=size, colorfmt='rgba')
+                self.texture.flip_vertical()
+
+            self.texture.blit_buffer(data, colorfmt='rgba', bufferfmt='ubyte')
+            self.widget.texture = self.texture
+            self.widget.canvas.ask_update()
+
+            self.event = Clock.schedule_once(self._show_next, duration)
+
+        self._fill_async()
+
+
+class Slideshow:
+    """
+    Timed Slideshow Driving The Carousel
+
+    Slides change on a fixed grid (start + n * interval), so late frames
+    never add up over days of running. The next image is decoded and
+    uploaded lead seconds before its transition. A slide that is still not
+    ready at its deadline is reported as missed: the show waits for it and
+    then rejoins the grid, skipping the ticks it lost. Only counters are
+    kept, the textures stay within the TextureCache budget.
+    """
+
+    def __init__(self, app, interval=5.0, tolerance=0.05):
+        self.app = app
+        self.interval = interval
+        self.tolerance = tolerance
+        self.lead = min(1.0, interval / 2)
+        self.started = None
+        self.ticks = 0
+        self.shown = 0
+        self.missed = 0
+        self.worst = 0.0
+        self.waiting = None
+        self.events = []
+
+    @property
+    def running(self):
+        """True while the slideshow is on"""
+
+        return self.started is not None
+
+    def start(self):
+        """Start from the current image"""
+
+        self.stop()
+
+        if not self.app.enable_carousel:
+            self.app.switch_to_carousel()
+
+        self.started = time.perf_counter()
+        self.ticks = 0
+        self.schedule()
+
+        Logger.info(f'Slideshow: every {self.interval:g} s')
+
+    def stop(self):
+        """Stop, keeping the current image"""
+
+        for event in self.events:
+            event.cancel()
+
+        self.events = []
+        self.waiting = None
+
+        if self.started is not None:
+            self.started = None
+            Logger.info(f'Slideshow: {self.shown} slides, {self.missed} missed deadlines, '
+                        f'worst {self.worst * 1000:.0f} ms late')
+
+    def deadline(self):
+        """Return the perf_counter time of the next transition"""
+
+        return self.started + (self.ticks + 1) * self.interval
+
+    def next_index(self):
+        """Return the index of the next slide, looping at the end, or None"""
+
+        if len(self.app.image_list) < 2:
+            return None
+
+        return (self.app.current_image + 1) % len(self.app.image_list)
+
+    def schedule(self):
+        """Schedule the preparation and the transition of the next slide"""
+
+        for event in self.events:
+            event.cancel()
+
+        delay = self.deadline() - time.perf_counter()
+
+        self.events = [Clock.schedule_once(self.prepare, max(0, delay - self.lead)),
+                       Clock.schedule_once(self.advance, max(0, delay))]
+
+    def prepare(self, dt=None):
+        """Have the next slide decoded and uploaded before its deadline"""
+
+        del dt
+
+        index = self.next_index()
+
+        if index is not None:
+            self.app.decoder.request(self.app.image_list[index])
+
+    def ready(self, index):
+        """Return True if the slide of index can be shown without decoding"""
+
+        path = self.app.image_list[index]
+
+        if (path, False) not in self.app.textures:
+            return False
+
+        slide = self.app.slide_window.get(index)
+
+        if slide is not None and slide.slide_path == path and slide.texture is None:
+            # Decoded since the slide was recycled, the cache hit is immediate
+            self.app.load_slide_image(slide, index)
+
+        return True
+
+    def advance(self, dt=None):
+        """Move to the next slide at its deadline"""
+
+        del dt
+
+        if not self.running:
+            return
+
+        index = self.next_index()
+
+        if index is None:
+            # Nothing to show yet, stay on the grid
+            self.ticks += 1
+            self.schedule()
+            return
+
+        now = time.perf_counter()
+        late = now - self.deadline()
+
+        if not self.ready(index):
+            if self.waiting != index:
+                self.waiting = index
+                self.missed += 1
+                Logger.warning(f'Slideshow: {self.app.image_list[index]} not decoded '
+                               f'at its deadline ({self.missed} missed)')
+            # Go as soon as it is decoded, or look again one interval later
+            self.app.decoder.request(
+                self.app.image_list[index],
+                lambda path, texture, index=index: self.waiting == index and self.advance())
+            for event in self.events:
+                event.cancel()
+            self.events = [Clock.schedule_once(self.advance, self.interval)]
+            return
+
+        if self.waiting != index and late > self.tolerance:
+            self.missed += 1
+            Logger.warning(f'Slideshow: transition {late * 1000:.0f} ms late '
+                           f'({self.missed} missed)')
+
+        self.waiting = None
+        self.worst = max(self.worst, late)
+        self.shown += 1
+
+        if index == self.app.current_image + 1:
+            self.app.carousel.load_next()
+        else:
+            self.app.carousel_goto(index)
+
+        # Rejoin the grid after a wait instead of drifting
+        self.ticks = max(self.ticks + 1, int((now - self.started) / self.interval))
+        self.schedule()
+
+
+class MetadataIndex:
+    """
+    Per-File Metadata Index In SQLite
+
+    Dimensions, EXIF capture time and orientation are read once from the
+    file headers (with Pillow, otherwise only file size and mtime) and kept
+    keyed by path, size and mtime, so sorting and filtering large folders
+    never opens the images again, across sessions too.
+    """
+
+    columns = ('name', 'size', 'mtime_ns', 'width', 'height', 'taken', 'orientation')
+
+    def __init__(self, path=None):
+        self.path = path or cache_path('metadata.sqlite3')
+        self.local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with self.connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS images ('
+                'directory TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, '
+                'width INTEGER, height INTEGER, taken TEXT, orientation INTEGER, '
+                'PRIMARY KEY (directory, name))')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS quarantine ('
+                'directory TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, reason TEXT, '
+                'PRIMARY KEY (directory, name))')
+
+    def connection(self):
+        """Return the SQLite connection of the calling thread"""
+
+        connection = getattr(self.local, 'connection', None)
+
+        if connection is None:
+            connection = self.local.connection = sqlite3.connect(self.path, timeout=30)
+
+        return connection
+
+    @staticmethod
+    def read(path, stat):
+        """Read the metadata of path from its header
+
+        Args:
+            path (str): absolute path of the image
+            stat (os.stat_result): stat of path
+
+        Returns:
+            tuple: (size, mtime_ns, width, height, taken, orientation)
+        """
+
+        width = height = taken = orientation = None
+
+        if PILImage is not None:
+            try:
+                with PILImage.open(path) as image:
+                    width, height = image.size
+                    exif = image.getexif()
+                    taken = exif.get_ifd(0x8769).get(0x9003) or exif.get(0x0132)
+                    orientation = exif.get(0x0112)
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+        return stat.st_size, stat.st_mtime_ns, width, height, taken, orientation
+
+    def index(self, directory, names, callback=None):
+        """Index names in directory on a background thread
+
+        Only files that are new or changed since the last run are read,
+        rows of files that are gone are removed.
+
+        Args:
+            directory (str): absolute directory
+            names (list): file names in directory
+            callback (callable, optional): called as callback(directory) on
+                the main thread when done. Defaults to None.
+        """
+
+        threading.Thread(target=self._index, args=(directory, list(names), callback),
+                         name='picev-index', daemon=True).start()
+
+    def _index(self, directory, names, callback):
+        """Update the rows of directory (runs in an index thread)"""
+
+        with tracer.span('index', directory=directory):
+            connection = self.connection()
+            known = dict(((name, (size, mtime_ns)) for name, size, mtime_ns in connection.execute(
+                'SELECT name, size, mtime_ns FROM images WHERE directory = ?', (directory,))))
+            rows = []
+
+            for name in names:
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+
+                if known.pop(name, None) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+
+                rows.append((directory, name) + self.read(os.path.join(directory, name), stat))
+
+                if len(rows) >= 500:
+                    self._write(connection, rows)
+                    rows = []
+
+            self._write(connection, rows)
+
+            with connection:
+                connection.executemany('DELETE FROM images WHERE directory = ? AND name = ?',
+                                       [(directory, name) for name in known])
+
+        if callback:
+            Clock.schedule_once(lambda dt: callback(directory))
+
+    @staticmethod
+    def _write(connection, rows):
+        """Insert or replace rows in one transaction"""
+
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                   rows)
+
+    def quarantine(self, directory, name, stat, reason):
+        """Remember that name can't be decoded while its size and mtime stay the same
+
+        Args:
+            directory (str): absolute directory
+            name (str): file name
+            stat (os.stat_result): stat of the file
+            reason (str): why it was rejected
+        """
+
+        with self.connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO quarantine VALUES (?, ?, ?, ?, ?)',
+                               (directory, name, stat.st_size, stat.st_mtime_ns, reason))
+
+    def quarantined(self, directory):
+        """Return {name: (size, mtime_ns)} of the known-bad files of directory"""
+
+        return {name: (size, mtime_ns) for name, size, mtime_ns in self.connection().execute(
+            'SELECT name, size, mtime_ns FROM quarantine WHERE directory = ?', (directory,))}
+
+    def rows(self, directory):
+        """Return {name: row} of directory, row being a dict of self.columns"""
+
+        return {row[0]: dict(zip(self.columns, row)) for row in self.connection().execute(
+            f'SELECT {", ".join(self.columns)} FROM images WHERE directory = ?', (directory,))}
+
+
+class App(MDApp):
+    """
+    Main App Class
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.props = {
+            'loading': None,
+            'notify': True,
+            'tile_toggled': None,
+            'tiles_stale': None,
+            'transition': AnimationTransition.out_quad,
+            'transition_str': 'out_quad',
+            'bar_toggled': None,
+            'keep_bar_shown': None,
+            'cursor_leaved': None,
+            'shown_image': None,
+            'recycling': None,
+            'scan': None,
+            'gif_stream': None,
+            'first_image': None,
+            'sort': 'name',
+            'sort_reverse': False,
+            'filter': {},
+            'nav_steps': 0
+        }
+
+        self.image = None
+        self.simple_image = Image()
+        self.textures = TextureCache()
+        self.decoder = DecodePool(self.textures, prefetch=2, display_size=Window.size,
+                                  previews=preview_store() if PILImage is not None else None,
+                                  on_error=self.on_decode_error)
+        self.thumbnails = ThumbnailCache(self.decoder.executor)
+        self.tiled_image = TiledImage(self.decoder) if PILImage is not None else None
+        self.pyramids = {}
+        self.probing = {}
+        self.prefetch_trigger = Clock.create_trigger(lambda dt: self.prefetch_neighbors())
+        self.tile_trigger = Clock.create_trigger(self._make_tile)
+        self.max_texture_size = glGetIntegerv(GL_MAX_TEXTURE_SIZE)[0]
+        self.tiled_pixels = 100 * 1000 * 1000
+
+        self.icon = os.path.split(os.path.realpath(sys.argv[0]))[0] + f'/logo-{__app__.lower()}.png'
+        self.title = __app__
+
+        self.loading_screen = Screen(name='loading_screen')
+
+        self.global_screen = Screen()
+        self.screen_mgr = ScreenManager()
+        self.global_screen.add_widget(self.screen_mgr)
+
+        self.base_view = ScatterLayout()
+        self.old_win_size = Window.size
+        self.up_popup = MDGridLayout(cols=1, size_hint=(1, None))
+        self.up_popup.md_bg_color = self.theme_cls.primary_color
+        self.up_popup.pos = (self.up_popup.pos[0], Window.size[1])
+        self.up_popup.size = (self.up_popup.size[0], 100)
+        self.tile_view = None
+        self.supported_images = list(SUPPORTED_IMAGES)
+        self.scanner = DirectoryScanner(self.supported_images)
+        self.current_image = 0
+        self.image_list = ImageList()
+        self.bar_toggled = True
+        self.old_size = None
+        self.base_image = None
+        self.enable_carousel = None
+        self._carousel = None
+        self.carousel_window = 2
+        self.slide_window = {}
+        self.file_manager = None
+        self.startup_target = 0.5
+
+        Window.bind(on_keyboard=self.on_keyboard)
+        Window.bind(size=lambda window, size: setattr(self.decoder, 'display_size', size))
+        self.base_view.bind(scale=self.on_view_scale)
+
+        if self.tiled_image:
+            self.base_view.bind(transform=lambda *args: self.tiled_image.redraw())
+        # Window.bind(size=self.on_resize)
+        Window.bind(on_cursor_leave=lambda dt: self.on_cursor_leaved(True))
+        Window.bind(on_cursor_enter=lambda dt: self.on_cursor_leaved(False))
+        Window.bind(mouse_pos=lambda window, pos: self.refresh())
+
+        self.anim_duration = 0.2
+
+        self.parser = optparse.OptionParser()
+        self.parser.add_option('-i', '--image', help='Show directly specified Image')
+        self.parser.add_option('-n', '--carousel', help='Disable Carousel Mode')
+        self.parser.add_option('-p', '--preload', help='Switch to simple view then carousel view')
+        self.parser.add_option('-c', '--cache-size', type='int',
+                               help='Decoded image cache budget in MB (default 512)')
+        self.parser.add_option('-w', '--watch', action='store_true',
+                               help='Watch the opened directory for added or removed images')
+        self.parser.add_option('-s', '--sort', choices=['name', 'date', 'size', 'dimensions'],
+                               help='Sort images by name, date, size or dimensions')
+        self.parser.add_option('-m', '--min-dimensions', metavar='WxH',
+                               help='Only list images at least W pixels wide and H high')
+        self.parser.add_option('--since', metavar='DATE',
+                               help='Only list images taken on or after DATE (YYYY-MM-DD)')
+        self.parser.add_option('--until', metavar='DATE',
+                               help='Only list images taken on or before DATE (YYYY-MM-DD)')
+        self.parser.add_option('-t', '--trace', metavar='FILE',
+                               help='Write a Chrome trace of the hot paths to FILE on exit')
+        self.parser.add_option('-o', '--perf-overlay', action='store_true',
+                               help='Show FPS, decode time and cache statistics')
+        self.parser.add_option('-j', '--jobs', type='int',
+                               help='Decode in JOBS worker processes (needs Pillow)')
+        self.parser.add_option('-S', '--slideshow', type='float', metavar='SECONDS',
+                               help='Start a slideshow changing image every SECONDS')
+        self.parser.add_option('-a', '--transition', metavar='NAME',
+                               help='Carousel transition (kivy AnimationTransition name, '
+                                    'default out_quad)')
+        self.shell_args = self.parser.parse_args()[0]
+
+        self.enable_carousel = self.shell_args.carousel
+
+        if self.shell_args.cache_size:
+            self.textures.max_bytes = self.shell_args.cache_size * 1024 * 1024
+
+        if self.shell_args.jobs and self.decoder.start_processes(self.shell_args.jobs):
+            self.thumbnails.processes = self.decoder.processes
+
+        if self.shell_args.slideshow is not None and self.shell_args.slideshow <= 0:
+            self.parser.error('--slideshow needs a positive number of seconds')
+
+        if PILImage is None and (self.shell_args.min_dimensions or self.shell_args.since
+                                 or self.shell_args.until):
+            # Sizes and EXIF dates are read with Pillow, every image would be filtered out
+            self.parser.error('--min-dimensions, --since and --until need Pillow')
+
+        if self.shell_args.min_dimensions:
+            try:
+                self.props['filter']['min_width'], self.props['filter']['min_height'] = (
+                    int(side) for side in self.shell_args.min_dimensions.lower().split('x'))
+            except ValueError:
+                Logger.warning(f'Filter: expected WxH, got {self.shell_args.min_dimensions}')
+
+        for bound in ('since', 'until'):
+            if getattr(self.shell_args, bound):
+                # EXIF dates are written 'YYYY:MM:DD HH:MM:SS'
+                self.props['filter'][bound] = getattr(self.shell_args, bound).replace('-', ':')
+
+        if self.shell_args.transition:
+            if hasattr(AnimationTransition, self.shell_args.transition):
+                self.props['transition_str'] = self.shell_args.transition
+                self.props['transition'] = getattr(AnimationTransition,
+                                                   self.shell_args.transition)
+            else:
+                Logger.warning(f'Slideshow: unknown transition {self.shell_args.transition}')
+
+        self.slideshow = Slideshow(self, self.shell_args.slideshow or 5.0)
+
+        tracer.enabled = bool(self.shell_args.trace)
+        self.perf_overlay = None
+        # Arrow presses are applied once per frame, passing images show thumbnails
+        self.nav_presses = deque(maxlen=32)
+        self.settle_delay = 0.15
+        self.navigate_trigger = Clock.create_trigger(self.apply_navigation)
+        self.settle_trigger = Clock.create_trigger(self.on_navigation_settled, self.settle_delay)
+        self.metadata = MetadataIndex()
+        self.props['sort'] = self.shell_args.sort or 'name'
+
+        self.watcher = DirectoryWatcher(self.on_directory_events) if self.shell_args.watch else None
+
+        if self.enable_carousel:
+            self.enable_carousel = int(self.enable_carousel)
+
+        self.view_screen = Screen(name='view_screen')
+
+        self.screen_mgr.add_widget(self.view_screen)
+        self.screen_mgr.add_widget(self.loading_screen)
+
+        self.bar_popup = MDGridLayout(rows=1, cols=11)
+        self.bar_popup.md_bg_color = self.theme_cls.primary_color
+        self.bar_popup.size_hint_y = None
+        self.bar_popup.size = (self.bar_popup.size[0], 50)
+        self.fullscreen_button = None
+        self.carousel_button = None
+        self.slideshow_button = None
+
+        self.mini_screen = Screen(name='mini_screen')
+        self.mini_screen.add_widget(self.base_view)
+
+        self.view_screen.add_widget(self.mini_screen)
+        self.view_screen.add_widget(self.bar_popup)
+        self.view_screen.add_widget(self.up_popup)
+
+        if self.enable_carousel:
+            self.make_carousel()
+        else:
+            self.make_simple_view()
+
+        if self.shell_args.image:
+            self.set_base_image(self.shell_args.image)
+
+        self.refresh()
+
+        # Everything not needed for the first image is built after the first frame
+        Clock.schedule_once(self.build_bar)
+
+        if self.shell_args.perf_overlay:
+            self.toggle_perf_overlay()
+
+        if self.shell_args.slideshow:
+            self.slideshow.start()
+
+    @property
+    def carousel(self):
+        """
+        The Carousel, built on first use
+        """
+
+        if self._carousel is None:
+            from kivy.uix.carousel import Carousel  # pylint: disable=import-outside-toplevel
+
+            self._carousel = Carousel(anim_type=self.props['transition_str'])
+            self._carousel.bind(current_slide=self.refresh_slide)
+
+        return self._carousel
+
+    def build_bar(self, dt=None):
+        """
+        Fill the bottom bar with its buttons
+        """
+
+        del dt
+
+        open_file = MDIconButton(icon="folder-open", on_release=self.choose_dir)
+        self.fullscreen_button = MDIconButton(icon="fullscreen", on_release=self.toggle_fullscreen)
+        before_button = MDIconButton(icon="arrow-left", on_release=self.select_before_image)
+        after_button = MDIconButton(icon="arrow-right", on_release=self.select_after_image)
+        self.carousel_button = MDIconButton(icon="view-array" if self.enable_carousel else "view-carousel",
+                                            on_release=self.toggle_carousel)
+        self.slideshow_button = MDIconButton(icon="pause" if self.slideshow.running else "play",
+                                             on_release=self.toggle_slideshow)
+        reset_scale = MDIconButton(icon="lock-reset", on_release=self.reset_scale)
+        edit_screen = MDIconButton(icon='draw')
+        perf_button = MDIconButton(icon='speedometer', on_release=self.toggle_perf_overlay)
+
+        self.bar_popup.add_widget(Spacer())
+        self.bar_popup.add_widget(open_file)
+        self.bar_popup.add_widget(self.fullscreen_button)
+        self.bar_popup.add_widget(before_button)
+        self.bar_popup.add_widget(after_button)
+        self.bar_popup.add_widget(self.carousel_button)
+        self.bar_popup.add_widget(self.slideshow_button)
+        self.bar_popup.add_widget(reset_scale)
+        self.bar_popup.add_widget(Spacer())
+        self.bar_popup.add_widget(perf_button)
+        self.bar_popup.add_widget(edit_screen)
+
+    def build_tile_view(self):
+        """
+        Build the tile strip RecycleView on first use
+        """
+
+        # pylint: disable=import-outside-toplevel
+        from kivy.uix.recycleboxlayout import RecycleBoxLayout
+        from kivy.uix.recycleview import RecycleView
+
+        self.tile_view = RecycleView(do_scroll_x=True, do_scroll_y=False, bar_width=0)
+        tile_layout = RecycleBoxLayout(orientation='horizontal',
+                                       size_hint=(None, 1),
+                                       default_size=(150, None),
+                                       default_size_hint=(None, 1))
+        tile_layout.bind(minimum_width=tile_layout.setter('width'))
+        self.tile_view.add_widget(tile_layout)
+        self.tile_view.viewclass = tile_class()
+        self.up_popup.add_widget(self.tile_view)
+
+    def on_first_image(self):
+        """
+        Log the startup time once the first image is on screen
+        """
+
+        if self.props['first_image']:
+            return
+
+        self.props['first_image'] = elapsed = time.perf_counter() - STARTED
+        message = f'Startup: first image after {elapsed * 1000:.0f} ms ' \
+                  f'(target {self.startup_target * 1000:.0f} ms)'
+
+        if elapsed > self.startup_target:
+            Logger.warning(message)
+        else:
+            Logger.info(message)
+
+    def get_screen_size(self):
+        from Xlib import display  # pylint: disable=import-outside-toplevel
+
+        Display = display.Display().screen()
+        width = Display['width_in_pixels']
+        height = Display['height_in_pixels']
+
+        return (width, height)
+
+    def on_keyboard(self, window=None, key=None, scancode=None, codepoint=None, modifier=None):
+        """
+        Special Keyboard Events for __app__
+
+        Args:
+            window (_type_, optional): window that called function. Defaults to None.
+            key (_type_, optional): Defaults to None.
+            scancode (_type_, optional): Defaults to None.
+            codepoint (_type_, optional): Defaults to None.
+            modifier (_type_, optional): Defaults to None.
+        """
+
+        if scancode == 80:
+            self.queue_navigation(-1)
+        elif scancode == 79:
+            self.queue_navigation(1)
+        elif scancode == 44:
+            self.toggle_slideshow()
+
+        del window
+        del key
+        del scancode
+        del codepoint
+        del modifier
+
+    def queue_navigation(self, step):
+        """Record an arrow press, presses of the same frame are applied together
+
+        Args:
+            step (int): 1 for the next image, -1 for the previous one
+        """
+
+        self.nav_presses.append((time.perf_counter(), step))
+        self.props['nav_steps'] += step
+        self.navigate_trigger()
+
+    def navigating(self):
+        """Return True while arrow presses come faster than self.settle_delay
+
+        That is a held arrow, the images it passes are not decoded.
+        """
+
+        now = time.perf_counter()
+        recent = [press for press, _step in self.nav_presses if now - press < self.settle_delay]
+
+        return len(recent) >= 2
+
+    def navigation_velocity(self):
+        """Return the images per second moved by the arrows over the last second
+
+        Positive when moving forward, negative when moving backward.
+        """
+
+        now = time.perf_counter()
+
+        return sum(step for press, step in self.nav_presses if now - press < 1.0)
+
+    def apply_navigation(self, dt=None):
+        """Move by the arrow presses of the last frame at once"""
+
+        del dt
+
+        steps = self.props['nav_steps']
+        self.props['nav_steps'] = 0
+
+        if not steps or not self.image_list:
+            return
+
+        passing = self.navigating()
+
+        if passing:
+            # Nothing queued is wanted any more, the settled image gets decoded first
+            self.decoder.cancel()
+            self.settle_trigger.cancel()
+            self.settle_trigger()
+
+        if steps == 1 and not passing:
+            self.select_after_image()
+        elif steps == -1 and not passing:
+            self.select_before_image()
+        else:
+            index = max(0, min(self.current_image + steps, len(self.image_list) - 1))
+
+            if index == self.current_image:
+                return
+
+            if self.enable_carousel:
+                self.carousel_goto(index)
+            else:
+                self.current_image = index
+                self.set_base_image(self.image_list[index])
+
+    def on_navigation_settled(self, dt=None):
+        """Decode the image the held arrow stopped on"""
+
+        del dt
+
+        if self.navigating() or not self.image_list:
+            return
+
+        if self.enable_carousel:
+            for slide in self.slide_window.values():
+                # Showing a thumbnail, nothing or the image it was recycled from
+                if getattr(slide, 'passing', None) or slide.texture is None:
+                    self.load_slide_image(slide, slide.slide_index)
+
+            self.carousel_goto(self.current_image)
+        else:
+            self.show_image(self.image_list[self.current_image])
+
+    def toggle_slideshow(self, caller=None):
+        """Start or stop the slideshow (switches to the Carousel)
+
+        Args:
+            caller (_type_, optional): caller of the function. Defaults to None.
+        """
+
+        if self.slideshow.running:
+            self.slideshow.stop()
+            self.make_caption('Slideshow Stopped')
+        else:
+            self.slideshow.start()
+            self.make_caption('Slideshow')
+
+        if self.slideshow_button:
+            self.slideshow_button.icon = 'pause' if self.slideshow.running else 'play'
+
+        del caller
+
+    def reset_scale(self, caller=None):
+        """Reset self.base_view (ScatterLayout) To Default
+
+        Args:
+            caller (_type_, optional): caller of the function. Defaults to None.
+        """
+
+        self.base_view.scale = 1.0
+        self.base_view.rotation = 0
+        self.base_view.pos = (0, 0)
+
+        view, path = self.shown_view()
+
+        if path:
+            # Go back to the display resolution texture
+            self.textures.discard((path, True))
+            texture = self.decoder.get(path)
+            if texture is not None:
+                view.texture = texture
+
+        self.make_caption('View Reseted')
+
+        del caller
+
+    def shown_view(self):
+        """Return the widget showing the current image and its path
+
+        Returns:
+            tuple: (Image, path), path is None if nothing decoded is shown
+        """
+
+        if self.enable_carousel:
+            slide = self.carousel.current_slide
+            return slide, getattr(slide, 'slide_path', None)
+
+        return self.simple_image, self.props['shown_image']
+
+    def on_view_scale(self, view, scale):
+        """Load the full resolution image once the scatter zooms past 1:1
+
+        Args:
+            view (ScatterLayout): self.base_view
+            scale (float): scale of self.base_view
+        """
+
+        del view
+
+        image, path = self.shown_view()
+
+        if path not in self.decoder.reduced or image is None or image.texture is None:
+            return
+
+        if image.norm_image_size[0] * scale > image.texture.width:
+            self.decoder.request(path, partial(self._on_full_decoded, image), full=True)
+
+    def _on_full_decoded(self, image, path, texture):
+        """Swap the full resolution texture in if the image is still zoomed"""
+
+        if self.shown_view() == (image, path) and self.base_view.scale > 1.0:
+            image.texture = texture
+
+    def toggle_perf_overlay(self, caller=None):
+        """Show or hide the FPS / decode / cache overlay
+
+        Args:
+            caller (_type_, optional): caller of the function. Defaults to None.
+        """
+
+        if self.perf_overlay:
+            self.perf_overlay[1].cancel()
+            self.global_screen.remove_widget(self.perf_overlay[0])
+            self.perf_overlay = None
+            tracer.sampling = False
+        else:
+            tracer.sampling = True
+            label = MDLabel(halign='left', valign='top', font_style='Caption',
+                            size_hint=(None, None), size=(300, 100),
+                            pos_hint={'x': 0.01, 'top': 0.99})
+            label.color = get_color_from_hex("#FFFFFF")
+            self.global_screen.add_widget(label)
+            self.perf_overlay = (label, Clock.schedule_interval(self.update_perf_overlay, 0.5))
+
+        del caller
+
+    def update_perf_overlay(self, dt=None):
+        """Refresh the overlay text
+
+        Args:
+            dt (float, optional): Time Passed. Defaults to None.
+        """
+
+        del dt
+
+        decode = tracer.average('decode')
+        decode = f'{decode:.1f} ms' if decode is not None else '-'
+
+        self.perf_overlay[0].text = (
+            f'FPS {Clock.get_fps():.0f}\n'
+            f'Decode {decode}\n'
+            f'Cache {self.textures.hit_rate() * 100:.0f}% hits, '
+            f'{self.textures.bytes / 1024 / 1024:.0f} MB in {len(self.textures)} textures')
+
+        if self.slideshow.running:
+            self.perf_overlay[0].text += (f'\nSlideshow {self.slideshow.shown} slides, '
+                                          f'{self.slideshow.missed} missed')
+
+    def make_caption(self, text, duration=1):
+        """Floating Fade-in & Fade-out text
+
+        Args:
+            text (_type_): _description_
+            duration (int, optional): _description_. Defaults to 1.
+        """
+
+        if self.props['notify']:
+            caption = MDLabel(text=text,
+                              opacity=0,
+                              halign='center',
+                              font_style='H2')
+
+            caption.color = get_color_from_hex("#FFFFFF")
+
+            animation = Animation(opacity=1, duration=duration)
+            animation += Animation(opacity=0, duration=duration)
+            animation.on_complete = lambda widget=caption: self.view_screen.remove_widget(widget)
+
+            self.global_screen.add_widget(caption)
+
+            animation.start(caption)
+    
+    @tracer.traced('get_img_list')
+    def get_img_list(self, directory=None, pinned=None):
+        """
+        Get Image List (ls like)
+
+        The directory is scanned on a background thread, batches of
+        results are merged into self.image_list as they arrive. The
+        working directory is never changed, entries are absolute paths
+        under self.image_list.root. ZIP/CBZ archives and HTTP directory
+        listings are listed like directories.
+
+        Args:
+            dir (_type_, optional): _description_. Defaults to None.
+            pinned (str, optional): image already shown, listed from the start
+                so the batches don't replace it. Defaults to None.
+        """
+
+        if not directory:
+            directory = self.image_list.root or '.'
+
+        if is_url(directory):
+            directory = directory.rstrip('/')
+            scan = self._scan_url
+        else:
+            directory = os.path.realpath(directory)
+            scan = self._scan_archive if is_archive(directory) else self._scan
+
+        self.image_list = ImageList(directory, [pinned] if pinned else ())
+        self.props['scan'] = token = object()
+
+        threading.Thread(target=scan, args=(directory, token),
+                         name='picev-scan', daemon=True).start()
+
+        if scan != self._scan and (self.props['filter'] or self.props['sort'] != 'name'):
+            # Only directories are indexed
+            Logger.warning('Scan: --sort, --min-dimensions, --since and --until are ignored '
+                           'for archives and URLs')
+
+        if self.watcher:
+            if scan == self._scan:
+                try:
+                    self.watcher.watch(directory)
+                except OSError as error:
+                    Logger.warning(f'Watch: {error}')
+            else:
+                # Archives and URLs aren't watched, nor is the previous directory
+                self.watcher.stop()
+
+        self.make_tile(0)
+
+    def _scan(self, directory, token):
+        """Run self.scanner and post its batches (runs in a scan thread)"""
+
+        names = []
+        quarantined = self.metadata.quarantined(directory)
+
+        try:
+            with tracer.span('scan', directory=directory), \
+                    ThreadPoolExecutor(max_workers=8, thread_name_prefix='picev-sniff') as sniffers:
+                for batch in self.scanner.scan(directory):
+                    batch = self.validate(directory, batch, quarantined, sniffers)
+                    names += batch
+                    paths = [os.path.join(directory, name) for name in batch]
+                    Clock.schedule_once(partial(self._on_scan_batch, token, paths))
+        except OSError as error:
+            Logger.warning(f'Scan: {directory}: {error}')
+            return
+
+        self.metadata.index(directory, names, lambda directory: self._on_indexed(token))
+
+    def _scan_archive(self, archive, token):
+        """List the images of a ZIP/CBZ archive (runs in a scan thread)
+
+        Only the central directory is read, members are decoded when shown.
+        """
+
+        try:
+            with tracer.span('scan', directory=archive):
+                names = Archive.get(archive).names(self.scanner.pattern)
+        except (OSError, zipfile.BadZipFile) as error:
+            Logger.warning(f'Scan: {archive}: {error}')
+            return
+
+        Logger.info(f'Scan: {len(names)} images in {archive}')
+
+        paths = [os.path.join(archive, name) for name in names]
+        Clock.schedule_once(partial(self._on_scan_batch, token, paths))
+
+    def _scan_url(self, url, token):
+        """List the images of an HTTP directory listing (runs in a scan thread)
+
+        The images are fetched when decoded, over the pooled connections.
+        """
+
+        try:
+            with tracer.span('scan', directory=url):
+                urls = http_source().listing(url + '/', self.scanner.pattern)
+        except OSError as error:
+            Logger.warning(f'Scan: {url}: {error}')
+            return
+
+        Logger.info(f'Scan: {len(urls)} images in {url}')
+
+        Clock.schedule_once(partial(self._on_scan_batch, token, urls))
+
+    def validate(self, directory, names, quarantined, sniffers):
+        """Drop the undecodable files of a scan batch (runs in a scan thread)
+
+        Headers are checked in parallel, known-bad files are skipped without
+        being read as long as their size and mtime did not change.
+
+        Args:
+            directory (str): absolute directory
+            names (list): file names found by the scanner
+            quarantined (dict): {name: (size, mtime_ns)} of known-bad files
+            sniffers (ThreadPoolExecutor): pool reading the headers
+
+        Returns:
+            list: the names worth showing
+        """
+
+        def check(name):
+            path = os.path.join(directory, name)
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return name, None, None, None
+
+            if quarantined.get(name) == (stat.st_size, stat.st_mtime_ns):
+                return name, None, None, stat
+
+            return (name,) + sniff(path) + (stat,)
+
+        valid = []
+
+        for name, kind, reason, stat in sniffers.map(check, names):
+            if kind is None:
+                if reason:
+                    Logger.warning(f'Scan: skipping {name}: {reason}')
+                    self.metadata.quarantine(directory, name, stat, reason)
+                continue
+
+            if not name.lower().endswith(f'.{kind}') and not (
+                    kind == 'jpg' and name.lower().endswith(('.jpeg', '.jpe'))):
+                self.decoder.kinds[os.path.join(directory, name)] = kind
+
+            valid.append(name)
+
+        return valid
+
+    def on_decode_error(self, path, error):
+        """Quarantine an image its decoder rejected and drop it from the list
+
+        Other failures (memory, shared memory, a format Kivy has no loader
+        for, the network) are only logged by DecodePool, the image is
+        decoded again next time.
+
+        Args:
+            path (str): absolute path of the image
+            error (Exception): decode error
+        """
+
+        if path not in self.image_list:
+            return
+
+        rejected = (SyntaxError, ValueError)
+
+        if PILImage is not None:
+            rejected += (PILImage.UnidentifiedImageError,)
+
+        if not isinstance(error, rejected):
+            return
+
+        try:
+            self.metadata.quarantine(*os.path.split(path), os.stat(path), str(error))
+        except OSError:
+            pass
+
+        self.remove_image(path)
+
+    def _on_indexed(self, token):
+        """Apply the filter and sort order once the opened directory is indexed"""
+
+        if token is not self.props['scan']:
+            return
+
+        if self.props['filter']:
+            self.filter_images(**self.props['filter'])
+        elif self.props['sort'] != 'name':
+            self.sort_images(self.props['sort'], self.props['sort_reverse'])
+
+    def sort_keys(self, key):
+        """Return {path: sort key} of self.image_list from the metadata index
+
+        Args:
+            key (str): 'name', 'date', 'size' or 'dimensions'
+        """
+
+        rows = self.metadata.rows(self.image_list.root)
+        keys = {}
+
+        for path in self.image_list:
+            name = os.path.basename(path)
+            row = rows.get(name) or {}
+
+            if key == 'date':
+                value = row.get('taken') or ''
+                if not value and row.get('mtime_ns'):
+                    # Without EXIF, the file mtime in the same format
+                    value = time.strftime('%Y:%m:%d %H:%M:%S',
+                                          time.localtime(row['mtime_ns'] / 1e9))
+            elif key == 'size':
+                value = row.get('size') or 0
+            elif key == 'dimensions':
+                value = (row.get('width') or 0) * (row.get('height') or 0)
+            else:
+                value = None
+
+            keys[path] = (value, name)
+
+        return keys
+
+    def sort_images(self, key='name', reverse=False):
+        """Sort self.image_list by key using the metadata index
+
+        Args:
+            key (str, optional): 'name', 'date', 'size' or 'dimensions'. Defaults to 'name'.
+            reverse (bool, optional): descending order. Defaults to False.
+        """
+
+        self.props['sort'] = key
+        self.props['sort_reverse'] = reverse
+
+        self.image_list.sort(None if key == 'name' else self.sort_keys(key), reverse)
+
+        self.reselect_base_image()
+
+    def filter_images(self, min_width=0, min_height=0, min_size=0, since=None, until=None):
+        """Keep only the indexed images of the opened directory matching the bounds
+
+        Calling it without bounds lists every indexed image again.
+
+        Args:
+            min_width (int, optional): minimum width in pixels. Defaults to 0.
+            min_height (int, optional): minimum height in pixels. Defaults to 0.
+            min_size (int, optional): minimum file size in bytes. Defaults to 0.
+            since (str, optional): earliest EXIF date ('YYYY:MM:DD ...'). Defaults to None.
+            until (str, optional): latest EXIF date, 'YYYY:MM:DD' includes the
+                whole day. Defaults to None.
+        """
+
+        matches = []
+
+        for name, row in self.metadata.rows(self.image_list.root).items():
+            if (row['width'] or 0) < min_width or (row['height'] or 0) < min_height:
+                continue
+            if (row['size'] or 0) < min_size:
+                continue
+            if since and (not row['taken'] or row['taken'] < since):
+                continue
+            if until and (not row['taken'] or row['taken'][:len(until)] > until):
+                continue
+            matches.append(os.path.join(self.image_list.root, name))
+
+        self.image_list = ImageList(self.image_list.root, matches)
+        self.sort_images(self.props['sort'], self.props['sort_reverse'])
+
+    def reselect_base_image(self):
+        """
+        Find self.base_image again after self.image_list was reordered
+        """
+
+        if not self.image_list:
+            self.make_tile(0)
+            return
+
+        if self.base_image not in self.image_list:
+            self.base_image = self.image_list[0]
+            if not self.enable_carousel:
+                self.show_image(self.base_image)
+
+        self.current_image = self.image_list.index(self.base_image)
+
+        if self.enable_carousel:
+            self.carousel_goto(self.current_image)
+        else:
+            self.prefetch_neighbors()
+
+        self.make_tile(0)
+
+    def _on_scan_batch(self, token, batch, dt=None):
+        """Merge a batch of scan results into self.image_list
+
+        Args:
+            token (object): scan that produced the batch
+            batch (list): absolute paths
+        """
+
+        del dt
+
+        if token is not self.props['scan']:
+            return
+
+        was_empty = not self.image_list
+
+        # Skips the files the watcher already added
+        changed = self.image_list.extend(batch)
+
+        if not self.image_list:
+            return
+
+        if was_empty:
+            self.props['bar_toggled'] = True
+            self.hide_bar()
+
+        if not self.base_image or self.base_image not in self.image_list:
+            # First batch, or the shown image was removed meanwhile
+            index = 0 if was_empty else min(self.current_image, len(self.image_list) - 1)
+            self.base_image = self.image_list[index]
+
+        self.current_image = self.image_list.index(self.base_image)
+
+        if self.enable_carousel:
+            self.carousel_goto(self.current_image)
+        elif was_empty:
+            self.show_image(self.base_image)
+
+        self.make_tile(changed)
+
+    def set_from_tile(self, tile):
+        """
+        Function That Select Image and show it to the widget
+
+        Args:
+            tile (Tile): _description_
+        """
+        if self.enable_carousel:
+            self.carousel_goto(tile.index)
+
+        self.current_image = tile.index
+        self.set_base_image(self.image_list[tile.index])
+
+    @staticmethod
+    def tile_data(image):
+        """Return the tile strip entry of image
+
+        Args:
+            image (str): entry of self.image_list
+        """
+
+        return {'image_path': image,
+                'text': os.path.basename(image).title()}
 
-        self.screen_mgr.add_widget(self.view_screen)
-        self.screen_mgr.add_widget(self.loading_screen)
+    @tracer.traced('_make_tile')
+    def _make_tile(self, dt=None):
+        """
+        Sync the tile strip with self.image_list
 
-        self.bar_popup = MDGridLayout(rows=1, cols=9)
-        self.bar_popup.md_bg_color = self.theme_cls.primary_color
-        self.bar_popup.size_hint_y = None
-        self.bar_popup.size = (self.bar_popup.size[0], 50)
+        Only the visible tiles exist, they are recycled while scrolling.
+        """
 
-        open_file = MDIconButton(icon="folder-open", on_release=self.choose_dir)
-        self.fullscreen_button = MDIconButton(icon="fullscreen", on_release=self.toggle_fullscreen)
-        before_button = MDIconButton(icon="arrow-left", on_release=self.select_before_image)
-        after_button = MDIconButton(icon="arrow-right", on_release=self.select_after_image)
-        self.carousel_button = MDIconButton(icon="view-carousel", on_release=self.toggle_carousel)
-        reset_scale = MDIconButton(icon="lock-reset", on_release=self.reset_scale)
-        edit_screen = MDIconButton(icon='draw')
+        self.refresh()
 
-        self.bar_popup.add_widget(Spacer())
-        self.bar_popup.add_widget(open_file)
-        self.bar_popup.add_widget(self.fullscreen_button)
-        self.bar_popup.add_widget(before_button)
-        self.bar_popup.add_widget(after_button)
-        self.bar_popup.add_widget(self.carousel_button)
-        self.bar_popup.add_widget(reset_scale)
-        self.bar_popup.add_widget(Spacer())
-        self.bar_popup.add_widget(edit_screen)
+        if self.tile_view is None:
+            if not self.image_list:
+                return
+            self.build_tile_view()
+            self.props['tiles_stale'] = 0
 
-        self.mini_screen = Screen(name='mini_screen')
-        self.mini_screen.add_widget(self.base_view)
+        start = self.props['tiles_stale']
 
-        self.view_screen.add_widget(self.mini_screen)
-        self.view_screen.add_widget(self.bar_popup)
-        self.view_screen.add_widget(self.up_popup)
+        if start is None:
+            return
 
-        if self.enable_carousel:
-            self.make_carousel()
-        else:
-            self.make_simple_view()
+        self.props['tiles_stale'] = None
 
-        if self.shell_args.image:
-            self.set_base_image(self.shell_args.image)
+        # Tiles before start are up to date, the others are reused when still listed
+        data = self.tile_view.data
+        entries = {entry['image_path']: entry for entry in data[start:]}
+        data[start:] = [entries.get(image) or self.tile_data(image)
+                        for image in self.image_list.paths[start:]]
 
-        self.refresh_look()
+    def insert_tile(self, index):
+        """Add the tile of self.image_list[index] without rebuilding the strip
 
-        clock = Clock.schedule_interval(self.refresh, 0.1)
-        del clock
+        Args:
+            index (int): index in self.image_list
+        """
 
-    def get_screen_size(self):
-        Display = display.Display().screen()
-        width = Display['width_in_pixels']
-        height = Display['height_in_pixels']
+        if self.tile_view is None:
+            self.make_tile()
+            return
 
-        return (width, height)
+        self.tile_view.data.insert(index, self.tile_data(self.image_list[index]))
 
-    def on_keyboard(self, window=None, key=None, scancode=None, codepoint=None, modifier=None):
-        """
-        Special Keyboard Events for __app__
+    def remove_tile(self, index):
+        """Remove the tile at index without rebuilding the strip
 
         Args:
-            window (_type_, optional): window that called function. Defaults to None.
-            key (_type_, optional): Defaults to None.
-            scancode (_type_, optional): Defaults to None.
-            codepoint (_type_, optional): Defaults to None.
-            modifier (_type_, optional): Defaults to None.
+            index (int): index in the tile strip
         """
 
-        if scancode == 80:
-            self.select_before_image()
-        elif scancode == 79:
-            self.select_after_image()
+        if self.tile_view is None:
+            self.make_tile()
+            return
 
-        del window
-        del key
-        del scancode
-        del codepoint
-        del modifier
+        del self.tile_view.data[index]
 
-    def reset_scale(self, caller=None):
-        """Reset self.base_view (ScatterLayout) To Default
+    def make_tile(self, start=None):
+        """Sync the tile strip with self.image_list on the next frame
 
         Args:
-            caller (_type_, optional): caller of the function. Defaults to None.
+            start (int, optional): first index of self.image_list that changed
+                since the last sync, None if only insert_tile/remove_tile
+                changed it. Defaults to None.
         """
 
-        self.base_view.scale = 1.0
-        self.base_view.rotation = 0
-        self.base_view.pos = (0, 0)
-
-        self.make_caption('View Reseted')
+        if start is not None:
+            stale = self.props['tiles_stale']
+            self.props['tiles_stale'] = start if stale is None else min(stale, start)
 
-        del caller
+        self.tile_trigger()
 
-    def make_caption(self, text, duration=1):
-        """Floating Fade-in & Fade-out text
+    def on_directory_events(self, directory, events):
+        """Apply watcher events to self.image_list
 
         Args:
-            text (_type_): _description_
-            duration (int, optional): _description_. Defaults to 1.
+            directory (str): watched directory
+            events (list): (mask, name) tuples from DirectoryWatcher
         """
 
-        if self.props['notify']:
-            caption = MDLabel(text=text,
-                              opacity=0,
-                              halign='center',
-                              font_style='H2')
+        if directory != self.image_list.root:
+            # Queued before another directory or archive was opened
+            return
 
-            caption.color = get_color_from_hex("#FFFFFF")
+        added = []
 
-            animation = Animation(opacity=1, duration=duration)
-            animation += Animation(opacity=0, duration=duration)
-            animation.on_complete = lambda widget=caption: self.view_screen.remove_widget(widget)
+        for mask, name in events:
+            path = os.path.join(directory, name)
 
-            self.global_screen.add_widget(caption)
+            if mask & DirectoryWatcher.REMOVED:
+                self.remove_image(path)
+            elif mask & DirectoryWatcher.ADDED and self.scanner.pattern.match(name):
+                # A rewritten file must not be served from the cache
+                self.decoder.discard(path)
+                added.append(name)
 
-            animation.start(caption)
-    
-    @staticmethod
-    def glob(root_dir, pathname):
-        pwd = os.getcwd()
+        if added:
+            # Checked like scanned files before being listed
+            threading.Thread(target=self._validate_added, args=(directory, added, self.props['scan']),
+                             name='picev-sniff', daemon=True).start()
 
-        os.chdir(root_dir)
+        self.refresh()
 
-        ls = glob.glob(pathname)
-        
-        os.chdir(pwd)
-		
-        return ls
+    def _validate_added(self, directory, names, token):
+        """Sniff the files the watcher added (runs in a sniff thread)"""
 
-    def get_img_list(self, directory=None):
-        """
-        Get Image List (ls like)
+        names = self.validate(directory, names, self.metadata.quarantined(directory),
+                              self.decoder.executor)
+
+        if names:
+            Clock.schedule_once(partial(self._on_validated, token,
+                                        [os.path.join(directory, name) for name in names]))
+
+    def _on_validated(self, token, paths, dt=None):
+        """Add the watched files that passed self.validate
 
         Args:
-            dir (_type_, optional): _description_. Defaults to None.
+            token (object): scan of the directory they were added to
+            paths (list): absolute paths
         """
 
-        if not directory:
-            if os.path.isdir(directory):
-                os.chdir(directory)
-            directory = '.'
-
-        self.image_list = []
+        del dt
 
-        for supported_image in self.supported_images:
-            self.image_list += self.glob(root_dir=directory, pathname=supported_image)
+        if token is not self.props['scan']:
+            return
 
-        self.image_list.sort()
+        for path in paths:
+            self.add_image(path)
 
-        if self.image_list:
-            self.props['bar_toggled'] = True
-            self.hide_bar()
-            if not self.base_image:
-                self.base_image = self.image_list[0]
+        self.refresh()
 
-        self.make_tile()
+    def shift_slides(self, index, delta):
+        """Shift the indices of the slides from index on by delta
 
-    def set_from_tile(self, tile):
+        Args:
+            index (int): first index in self.image_list that moved
+            delta (int): 1 after an insertion, -1 after a removal
         """
-        Function That Select Image and show it to the widget
+
+        window = {}
+
+        for slide_index, slide in self.slide_window.items():
+            if slide_index >= index:
+                slide_index += delta
+                slide.slide_index = slide_index
+            window[slide_index] = slide
+
+        self.slide_window = window
+
+    def add_image(self, path):
+        """Insert path into self.image_list, the tile strip and the Carousel
 
         Args:
-            tile (SmartTile): _description_
+            path (str): absolute path in the opened directory
         """
-        if self.carousel.slides:
-            self.carousel.load_slide(self.carousel.slides[self.props['tiles'].index(tile)])
+
+        index = self.image_list.insert(path)
+
+        if index is None:
+            return
+
+        self.insert_tile(index)
+        self.shift_slides(index, 1)
+
+        if len(self.image_list) == 1:
+            self.current_image = 0
+            self.base_image = path
+            if not self.enable_carousel:
+                self.show_image(path)
+        elif index <= self.current_image:
+            self.current_image += 1
 
         if self.enable_carousel:
-            self.current_image = self.props['tiles'].index(tile)
-            self.set_base_image(self.image_list[self.props['tiles'].index(tile)])
-        elif not self.enable_carousel:
-            self.current_image = self.image_list.index(os.path.split(tile.source)[1])
-            self.set_base_image(os.path.split(tile.source)[1])
+            self.carousel_goto(self.current_image)
 
-    def _make_tile(self, dt=None):
-        """
-        Create Group of SmartTile Classes from self.image_list
+    def remove_image(self, path):
+        """Remove path from self.image_list, the tile strip and the Carousel
+
+        Args:
+            path (str): absolute path in the opened directory
         """
 
-        self.up_popup.clear_widgets()
-        self.props['tiles'].clear()
+        index = self.image_list.remove(path)
 
-        for image in self.image_list:
-            self.up_popup.cols += 1
-            tile = SmartTile(source=os.path.realpath(image),
-                             size_hint=(0.2, 1),
-                             on_release=self.set_from_tile)
+        if index is None:
+            return
 
-            tile.text = os.path.split(image)[1].title()
-            tile.font_style = 'Caption'  # Must be one of:
-            # ['H1', 'H2', 'H3', 'H4', 'H5',
-            # 'H6', 'Subtitle1', 'Subtitle2',
-            # 'Body1', 'Body2', 'Button',
-            # 'Caption', 'Overline', 'Icon']
+        self.remove_tile(index)
+        self.slide_window.pop(index, None)
+        self.shift_slides(index + 1, -1)
 
-            self.props['tiles'].append(tile)
-            self.up_popup.add_widget(tile)
-            
-    def make_tile(self):
-        Clock.schedule_once(self._make_tile)
+        if index < self.current_image:
+            self.current_image -= 1
+        elif index == self.current_image and self.image_list:
+            self.current_image = min(index, len(self.image_list) - 1)
+            self.base_image = self.image_list[self.current_image]
+            if not self.enable_carousel:
+                self.show_image(self.base_image)
+
+        if self.enable_carousel:
+            self.carousel_goto(self.current_image)
 
     def toggle_carousel(self, caller=None):
         """
@@ -384,6 +2892,7 @@ class App(MDApp):
 
         del caller
 
+    @tracer.traced('set_base_image')
     def set_base_image(self, path):
         """
         Select Image (Base Function)
@@ -392,40 +2901,256 @@ class App(MDApp):
             path (_type_): _description_
         """
         
-        _path = os.path.split(os.path.realpath(path))
+        url = is_url(path)
+
+        if path not in self.image_list and not url:
+            path = os.path.realpath(path)
+
+        # An image URL, anything else is taken as a directory listing
+        url_image = url and self.scanner.pattern.match(path.rsplit('/', 1)[-1])
 
         if path in self.image_list:
             self.base_image = path
             if not self.enable_carousel:
-                self.image.source = path
+                self.show_image(path)
+
+        elif url and not url_image or os.path.isdir(path) or is_archive(path):
+            self.get_img_list(directory=path)
+
+            self.refresh_look()
+
+        elif url_image or os.path.isfile(path) or split_archive(path)[0]:
+            # Show the image right away, then list its directory (or archive)
+            if url_image:
+                root = path.rsplit('/', 1)[0]
+            else:
+                root = split_archive(path)[0] or os.path.dirname(path)
+
+            self.base_image = path
+            self.image_list = ImageList(root, [path])
+            self.current_image = 0
+
+            if self.enable_carousel:
                 self.pre_carousel()
+            else:
+                self.show_image(path)
+
+            self.get_img_list(directory=self.image_list.root, pinned=path)
+
+        self.make_tile()
+
+    def show_image(self, path):
+        """Show path in the simple view without decoding on the main thread
+
+        Args:
+            path (str): absolute image path
+        """
+
+        # Passing through, on_navigation_settled decodes where the arrow stops
+        passing = self.navigating() and (path, False) not in self.textures
+        # False while the size is read, _on_shown_probed shows path once known
+        pyramid = None if passing else self.tile_pyramid(path, self._on_shown_probed)
+
+        if passing or pyramid is False:
+            self.props['shown_image'] = path
+            self.play_animation(None, None)
+            self.set_view(self.simple_image)
+            self.show_thumbnail(self.simple_image, path)
+            return
+
+        if pyramid:
+            self.props['shown_image'] = None
+            self.play_animation(None, None)
+            self.set_view(self.tiled_image)
+            self.tiled_image.show(pyramid)
+            self.prefetch_neighbors()
+            return
+
+        self.set_view(self.simple_image)
+
+        self.simple_image.passing = None
+        self.simple_image.source = ''
+        self.props['shown_image'] = path
+        self.decoder.request(path, self._on_decoded)
+
+        self.play_animation(self.simple_image, path)
+        self.prefetch_neighbors()
+
+    def play_animation(self, widget, path):
+        """Play path in widget if it is a GIF, and stop any other animation
+
+        Only the shown image animates, every other GIF shows its first frame.
+
+        Args:
+            widget (Image): widget showing path
+            path (str): absolute path of the image
+        """
+
+        stream = self.props['gif_stream']
+
+        if stream and stream.widget is widget and stream.path == path:
+            return
+
+        if stream:
+            stream.stop()
+            self.props['gif_stream'] = None
+
+        if widget is None or not path or not path.lower().endswith('.gif'):
+            return
+
+        if PILImage is not None:
+            self.props['gif_stream'] = GifStream(path, widget, self.decoder.executor)
+            self.props['gif_stream'].play()
         else:
-            if os.path.isfile(_path[1]):
-                os.chdir(_path[0])
-                self.image_list = [_path[1]]
+            widget.source = path
 
-                self.make_carousel()
+    def set_view(self, widget):
+        """Swap widget (self.simple_image, self.tiled_image or self.carousel)
+        into self.base_view, the other views stay alive"""
 
-                self.carousel.load_slide(self.carousel.slides[self.current_image])
+        if widget.parent is None:
+            self.base_view.clear_widgets()
+            self.base_view.add_widget(widget)
 
-        if os.path.isdir(path):
-            if not path.endswith('/'):
-                path = path + '/'
+    def tile_pyramid(self, path, callback=None):
+        """Return the TilePyramid of path, None if it fits a single texture,
+        or False while its header is read on a worker thread
 
-            self.get_img_list(directory=path)
-	
-            os.chdir(path)
+        Args:
+            path (str): absolute path of the image
+            callback (callable, optional): called as callback(path) on the main
+                thread once the size of path is known. Defaults to None.
+        """
 
-            self.refresh_look()
+        if self.tiled_image is None:
+            return None
+
+        if path in self.pyramids:
+            return self.pyramids[path]
+
+        callbacks = self.probing.get(path)
+
+        if callbacks is None:
+            callbacks = self.probing[path] = []
+            future = self.decoder.executor.submit(self._probe_size, path)
+            future.add_done_callback(
+                lambda future: Clock.schedule_once(partial(self._on_probed, path, future)))
+
+        if callback:
+            callbacks.append(callback)
+
+        return False
+
+    @staticmethod
+    def _probe_size(path):
+        """Return (size, True if JPEG) of path from its header, or None (runs in a worker)
+
+        Remote images and archive members are never tiled, so they keep
+        Pillow's decompression bomb limit.
+        """
+
+        if is_url(path) or split_archive(path)[0]:
+            return None
+
+        try:
+            with open_unbounded(path) as image:
+                return image.size, image.format in ('JPEG', 'MPO')
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+    def _on_probed(self, path, future, dt=None):
+        """Decide whether path is tiled and call back the waiting callers"""
+
+        del dt
+
+        size, scalable = future.result() or (None, False)
+        pyramid = None
 
+        if size and (max(size) > self.max_texture_size
+                     or size[0] * size[1] > self.tiled_pixels):
+            try:
+                pyramid = TilePyramid(path, size, cache_path('tiles'), scalable)
+            except (OSError, ValueError) as error:
+                Logger.warning(f'Tiles: {path}: {error}, decoding at display size')
+
+        self.pyramids[path] = pyramid
+
+        for callback in self.probing.pop(path, []):
+            callback(path)
+
+    def show_thumbnail(self, widget, path):
+        """Show the thumbnail of path in widget while passing through
+
+        Thumbnails not on disk yet are generated, widget keeps its previous
+        image meanwhile instead of going black.
+
+        Args:
+            widget (Image): self.simple_image or a Carousel slide
+            path (str): absolute path of the image
+        """
+
+        widget.passing = path
+        thumbnail = self.thumbnails.get(path)
+
+        if thumbnail:
+            widget.source = thumbnail
         else:
-            if self.image:
-                if os.path.split(path)[1] not in self.image_list:
-                    if path not in self.image_list:
-                        self.image_list.append(path)
-                self.image.source = path
+            self.thumbnails.request(path, partial(self._on_passing_thumbnail, widget, path))
 
-        self.make_tile()
+    def _on_passing_thumbnail(self, widget, path, thumbnail):
+        """Show a generated thumbnail if widget still passes through path"""
+
+        # A failed thumbnail falls back to the image itself, too slow to load here
+        if widget.passing == path and thumbnail.startswith(self.thumbnails.directory + os.sep):
+            widget.source = thumbnail
+
+    def _on_shown_probed(self, path):
+        """Show path once its size is known, if it is still the shown image"""
+
+        if self.props['shown_image'] == path and not self.enable_carousel:
+            self.show_image(path)
+
+    def _on_decoded(self, path, texture):
+        """Swap the decoded texture in if path is still the shown image"""
+
+        if self.props['shown_image'] == path and not self.enable_carousel \
+                and not self.simple_image.source:
+            self.simple_image.texture = texture
+            self.on_first_image()
+
+    def prefetch_neighbors(self):
+        """
+        Decode the next and previous images around self.current_image
+        """
+
+        count = self.decoder.prefetch_count
+        velocity = self.navigation_velocity()
+        paths = []
+
+        if velocity:
+            # Moving, look further ahead and keep one image behind
+            direction = 1 if velocity > 0 else -1
+            offsets = [0]
+            for offset in range(1, 2 * count + 1):
+                offsets.append(offset * direction)
+                if offset == 1:
+                    offsets.append(-direction)
+        else:
+            offsets = [0]
+            for offset in range(1, count + 1):
+                offsets += [offset, -offset]
+
+        for offset in offsets:
+            index = self.current_image + offset
+            if 0 <= index < len(self.image_list):
+                path = self.image_list[index]
+                pyramid = self.tile_pyramid(path, lambda path: self.prefetch_trigger())
+                if pyramid is None:
+                    paths.append(path)
+
+        # Prefetches left behind by a jump would only delay these
+        self.decoder.cancel(set(paths) | {slide.slide_path for slide in self.slide_window.values()})
+        self.decoder.prefetch(paths)
 
     def refresh_slide(self, carousel, slide):
         """
@@ -436,9 +3161,13 @@ class App(MDApp):
             slide (One Of Carousel.slides)
         """
 
+        del carousel
+
         if slide:
-            if not self.props['loading']:
-                self.current_image = carousel.slides.index(slide)
+            if not self.props['loading'] and not self.props['recycling']:
+                self.current_image = slide.slide_index
+                self.base_image = self.image_list[slide.slide_index]
+                Clock.schedule_once(lambda dt: self.carousel_goto(self.current_image))
 
     def pause(self):
         """
@@ -464,10 +3193,24 @@ class App(MDApp):
 
             self.screen_mgr.current = 'view_screen'
 
+    def on_cursor_leaved(self, leaved):
+        """Track whether the cursor is outside the window
+
+        Args:
+            leaved (bool): True when the cursor left the window
+        """
+
+        self.props['cursor_leaved'] = leaved
+
+        self.refresh()
+
     def refresh(self, clock_time=None):
         """
         Popup Management
 
+        Called on mouse motion, cursor enter/leave and image list changes,
+        so an idle window has no scheduled callbacks.
+
         Args:
             clock_time (float, optional): Time Passed. Defaults to None.
         """
@@ -564,47 +3307,138 @@ class App(MDApp):
         """
 
         if not self.props['loading']:
-            self.make_caption('Carousel View (Slow)')
+            self.make_caption('Carousel View')
 
             self.make_carousel()
 
+    @tracer.traced('pre_carousel')
     def pre_carousel(self):
         """
-        Optimize Carousel Widget
+        Fill the Carousel with the slide window around self.current_image
         """
 
         if not self.image_list:
             self.get_img_list()
 
-        for src in self.image_list:
-            self.carousel.add_widget(Image(source=src))
+        self.slide_window = {}
 
-        if self.current_image and self.enable_carousel:
-            self.carousel.load_slide(self.carousel.slides[self.current_image])
+        self.carousel_goto(self.current_image)
 
-    def make_carousel(self):
+    def carousel_goto(self, index):
+        """Recycle the Carousel slides so the window is centered on index
+
+        Only current_image +- self.carousel_window slides exist, slides
+        leaving the window are reused for the ones entering it.
+
+        Args:
+            index (int): index in self.image_list
         """
-        Optimize and set screen to Carousel View
+
+        if not self.image_list:
+            return
+
+        index = max(0, min(index, len(self.image_list) - 1))
+        start = max(0, index - self.carousel_window)
+        stop = min(len(self.image_list), index + self.carousel_window + 1)
+
+        spare = [slide for slide_index, slide in self.slide_window.items()
+                 if not start <= slide_index < stop]
+        window = {}
+
+        for slide_index in range(start, stop):
+            slide = self.slide_window.get(slide_index)
+
+            if slide is None:
+                slide = spare.pop() if spare else Image()
+                self.load_slide_image(slide, slide_index)
+            elif slide.slide_path != self.image_list[slide_index]:
+                # The list changed under the window
+                self.load_slide_image(slide, slide_index)
+
+            window[slide_index] = slide
+
+        self.slide_window = window
+        self.current_image = index
+        # Swipes, arrows and the slideshow all end here
+        self.base_image = self.image_list[index]
+
+        slides = [window[slide_index] for slide_index in range(start, stop)]
+
+        self.props['recycling'] = True
+
+        if self.carousel.slides != slides:
+            self.carousel.clear_widgets()
+            for slide in slides:
+                self.carousel.add_widget(slide)
+
+        self.carousel.index = index - start
+
+        self.props['recycling'] = False
+
+        if self.navigating():
+            self.play_animation(None, None)
+            return
+
+        self.play_animation(window[index], window[index].slide_path)
+        self.prefetch_neighbors()
+
+    def load_slide_image(self, slide, index):
+        """Point a (recycled) slide at self.image_list[index]
+
+        Args:
+            slide (Image): Carousel slide
+            index (int): index in self.image_list
         """
 
-        self.enable_carousel = True
+        path = self.image_list[index]
 
-        self.pause()
+        slide.slide_index = index
+        slide.slide_path = path
 
-        self.carousel.clear_widgets()
+        if self.navigating() and (path, False) not in self.textures:
+            # Passing through, on_navigation_settled decodes it if the arrow stops here
+            self.show_thumbnail(slide, path)
+            return
 
-        Logger.info('View: Mode Changed To Carousel')
+        slide.passing = None
+        slide.source = ''
+        slide.texture = None
+        self.decoder.request(path, partial(self._on_slide_decoded, slide, index))
+
+    @staticmethod
+    def _on_slide_decoded(slide, index, path, texture):
+        """Set the decoded texture if the slide was not recycled meanwhile"""
+
+        del path
+
+        if slide.slide_index == index and not slide.source:
+            slide.texture = texture
+            MDApp.get_running_app().on_first_image()
 
-        self.base_view.clear_widgets()
+    @tracer.traced('make_carousel')
+    def make_carousel(self):
+        """
+        Set screen to Carousel View
+
+        The Carousel is kept between switches, only its slide window is
+        moved to self.current_image.
+        """
+
+        self.enable_carousel = True
+
+        Logger.info('View: Mode Changed To Carousel')
 
-        self.pre_carousel()
+        if self.slide_window:
+            self.carousel_goto(self.current_image)
+        else:
+            self.pre_carousel()
 
         self.image = self.carousel
 
-        self.base_view.add_widget(self.image)
-        self.carousel_button.icon = 'view-array'
+        self.set_view(self.carousel)
 
-        self.resume()
+        if self.carousel_button:
+            self.carousel_button.icon = 'view-array'
 
     def switch_to_simple_view(self):
         """
@@ -612,29 +3446,35 @@ class App(MDApp):
         """
 
         if not self.props['loading']:
-            self.make_caption('Simple View (Fast)')
+            self.make_caption('Simple View')
             self.make_simple_view()
 
     def make_simple_view(self):
         """
-        Optimize and set screen to Simple View
+        Set screen to Simple View
+
+        self.simple_image is kept between switches, the current image is
+        usually served from the texture cache.
         """
 
         self.enable_carousel = False
-        self.image = Image()
+        self.image = self.simple_image
         Logger.info('View: Mode Changed To Simple View')
 
-        if len(self.image_list) <= 1:
-            if self.image_list:
-                self.set_base_image(self.image_list[self.current_image])
-        else:
-            self.image.source = self.image_list[self.current_image]
+        # The slideshow only runs on the Carousel
+        if self.slideshow.running:
+            self.slideshow.stop()
 
-        self.base_view.clear_widgets()
+            if self.slideshow_button:
+                self.slideshow_button.icon = 'play'
 
-        self.base_view.add_widget(self.image)
+        if self.image_list:
+            self.show_image(self.image_list[self.current_image])
+        else:
+            self.set_view(self.simple_image)
 
-        self.carousel_button.icon = 'view-carousel'
+        if self.carousel_button:
+            self.carousel_button.icon = 'view-carousel'
 
     def choose_dir(self, caller=None):
         """Get Group Of Images from Directory (from self.shell_args.image)
@@ -648,8 +3488,22 @@ class App(MDApp):
             else:
                 directory = self.shell_args.image
         else:
+            directory = self.image_list.root or os.getcwd()
+
+        if is_url(directory):
+            # The file manager only browses local files
             directory = os.getcwd()
 
+        # Start next to an opened archive
+        directory = os.path.realpath(directory)
+        while not os.path.isdir(directory):
+            directory = os.path.dirname(directory)
+
+        if self.file_manager is None:
+            from kivymd.uix.filemanager import MDFileManager  # pylint: disable=import-outside-toplevel
+
+            self.file_manager = MDFileManager(ext=list(SUPPORTED_EXTENSIONS + ARCHIVE_EXTENSIONS))
+
         self.file_manager.select_path = self.select_path
         self.file_manager.exit_manager = self.exit_manager
 
@@ -701,6 +3555,20 @@ class App(MDApp):
 
         return self.global_screen
 
+    def on_stop(self):
+        '''
+        Stop Background Workers
+        '''
+
+        self.slideshow.stop()
+        self.decoder.shutdown()
+
+        if self.watcher:
+            self.watcher.stop()
+
+        if self.shell_args.trace:
+            tracer.save(self.shell_args.trace)
+
 if __name__ == '__main__':
     app = App()
     app.run()
@@ -0,0 +1,283 @@
+"""
+Kivy-Free Helpers Of cache.py
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zipfile
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import (Archive, ThumbnailStore, evict, image_pattern,  # pylint: disable=wrong-import-position
+                   sniff, split_archive)
+
+PNG = (b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+       + b'\x00\x00\x00\x00IEND\xaeB`\x82')
+JPEG = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + b'\x00' * 64 + b'\xff\xd9'
+GIF = b'GIF89a' + b'\x00' * 64 + b';'
+
+
+class SniffTest(unittest.TestCase):
+    """
+    Format Detection From The First And Last Bytes
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def sniff(self, content, name='image'):
+        path = os.path.join(self.temporary.name, name)
+
+        with open(path, 'wb') as file:
+            file.write(content)
+
+        return sniff(path)
+
+    def test_formats(self):
+        self.assertEqual(self.sniff(PNG), ('png', None))
+        self.assertEqual(self.sniff(JPEG), ('jpg', None))
+        self.assertEqual(self.sniff(GIF), ('gif', None))
+        self.assertEqual(self.sniff(b'BM' + b'\x00' * 32), ('bmp', None))
+
+    def test_content_over_extension(self):
+        self.assertEqual(self.sniff(PNG, 'image.jpg'), ('png', None))
+
+    def test_unknown_format(self):
+        self.assertEqual(self.sniff(b'<html></html>'), (None, 'unknown format'))
+        self.assertEqual(self.sniff(b''), (None, 'unknown format'))
+
+    def test_truncated(self):
+        self.assertEqual(self.sniff(PNG[:-12]), (None, 'truncated PNG'))
+        self.assertEqual(self.sniff(GIF[:-1]), (None, 'truncated GIF'))
+
+    def test_data_after_jpeg_end(self):
+        # Padding, Motion Photo videos and MPF trailers follow the EOI marker
+        self.assertEqual(self.sniff(JPEG + b'\x00' * 200), ('jpg', None))
+        self.assertEqual(self.sniff(JPEG + b'ftypmp42' + b'\x01' * 4096), ('jpg', None))
+
+    def test_missing_file(self):
+        kind, reason = sniff(os.path.join(self.temporary.name, 'missing'))
+
+        self.assertIsNone(kind)
+        self.assertTrue(reason)
+
+
+def stored_zip(path, name, data, local_extra):
+    """Write a one-member stored ZIP whose local extra field is not in the central directory"""
+
+    name = name.encode()
+    crc = zlib.crc32(data)
+    local = struct.pack('<4s5H3L2H', b'PK\x03\x04', 20, 0, 0, 0, 0x21, crc, len(data), len(data),
+                        len(name), len(local_extra)) + name + local_extra + data
+    central = struct.pack('<4s6H3L5H2L', b'PK\x01\x02', 20, 20, 0, 0, 0, 0x21, crc, len(data),
+                          len(data), len(name), 0, 0, 0, 0, 0, 0) + name
+    end = struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, 1, 1, len(central), len(local), 0)
+
+    with open(path, 'wb') as file:
+        file.write(local + central + end)
+
+
+class ArchiveTest(unittest.TestCase):
+    """
+    Reading Members Straight From The Mapped Archive
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temporary.name, 'comic.cbz')
+        self.data = bytes(range(256)) * 64
+
+        with zipfile.ZipFile(self.path, 'w') as archive:
+            archive.writestr('stored.png', self.data, compress_type=zipfile.ZIP_STORED)
+            archive.writestr('pages/deflated.jpg', self.data, compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr('pages/.hidden.jpg', b'hidden')
+            archive.writestr('notes.txt', b'text')
+            archive.writestr('empty/', b'')
+
+    def tearDown(self):
+        Archive._open.clear()  # pylint: disable=protected-access
+        self.temporary.cleanup()
+
+    def test_names(self):
+        names = Archive.get(self.path).names(image_pattern())
+
+        self.assertEqual(sorted(names), ['pages/deflated.jpg', 'stored.png'])
+
+    def test_read_stored(self):
+        data = Archive.get(self.path).read('stored.png')
+
+        # Not copied out of the mmap
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(bytes(data), self.data)
+
+    def test_read_deflated(self):
+        self.assertEqual(Archive.get(self.path).read('pages/deflated.jpg'), self.data)
+
+    def test_open(self):
+        for name in ('stored.png', 'pages/deflated.jpg'):
+            with Archive.get(self.path).open(name) as file:
+                self.assertEqual(file.read(16), self.data[:16])
+                file.seek(256)
+                self.assertEqual(file.read(), self.data[256:])
+
+    def test_local_extra_field(self):
+        path = os.path.join(self.temporary.name, 'extra.zip')
+        stored_zip(path, 'image.png', self.data, b'\xfe\xca\x04\x00abcd')
+
+        self.assertEqual(bytes(Archive.get(path).read('image.png')), self.data)
+
+    def test_reopened_when_changed(self):
+        archive = Archive.get(self.path)
+        self.assertIs(Archive.get(self.path), archive)
+
+        with zipfile.ZipFile(self.path, 'a') as changed:
+            changed.writestr('added.png', b'added')
+
+        self.assertIn('added.png', Archive.get(self.path).members)
+
+
+class SplitArchiveTest(unittest.TestCase):
+    """
+    Virtual Paths Of Archive Members
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.temporary.name, 'Comic.CBZ')
+
+        with zipfile.ZipFile(self.archive, 'w') as archive:
+            archive.writestr('pages/01.png', b'')
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_member(self):
+        path = os.path.join(self.archive, 'pages', '01.png')
+
+        self.assertEqual(split_archive(path), (self.archive, 'pages/01.png'))
+
+    def test_regular_path(self):
+        self.assertEqual(split_archive(os.path.join(self.temporary.name, 'image.png')),
+                         (None, None))
+
+    def test_directory_named_like_an_archive(self):
+        directory = os.path.join(self.temporary.name, 'photos.zip')
+        os.mkdir(directory)
+
+        self.assertEqual(split_archive(os.path.join(directory, 'image.png')), (None, None))
+
+
+class EvictTest(unittest.TestCase):
+    """
+    Oldest-First Eviction Of Cache Files And Directories
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.directory = self.temporary.name
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def write(self, name, size, mtime):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'wb') as file:
+            file.write(b'\0' * size)
+
+        os.utime(path, (mtime, mtime))
+
+    def listing(self):
+        return sorted(os.path.relpath(os.path.join(root, name), self.directory)
+                      for root, _dirs, files in os.walk(self.directory) for name in files)
+
+    def test_files(self):
+        self.write('old', 100, 1000)
+        self.write('shard/middle', 100, 2000)
+        self.write('new', 100, 3000)
+
+        evict(self.directory, 200)
+
+        self.assertEqual(self.listing(), ['new', os.path.join('shard', 'middle')])
+
+    def test_whole_directories(self):
+        # The newest file dates a directory, none is left half removed
+        self.write('old/0/0_0.jpg', 100, 1000)
+        self.write('old/done', 1, 4000)
+        self.write('new/0/0_0.jpg', 100, 5000)
+        self.write('new/done', 1, 5000)
+
+        evict(self.directory, 150, whole_directories=True)
+
+        self.assertEqual(self.listing(), [os.path.join('new', '0', '0_0.jpg'),
+                                          os.path.join('new', 'done')])
+
+    def test_fits(self):
+        self.write('old', 100, 1000)
+
+        evict(self.directory, 100)
+
+        self.assertEqual(self.listing(), ['old'])
+
+
+class ThumbnailStoreKeyTest(unittest.TestCase):
+    """
+    Thumbnails Keyed By Path, Size And mtime
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.store = ThumbnailStore(os.path.join(self.temporary.name, 'thumbnails'))
+        self.image = os.path.join(self.temporary.name, 'image.png')
+
+        with open(self.image, 'wb') as file:
+            file.write(b'image')
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_stable(self):
+        key = self.store.key(self.image)
+
+        self.assertEqual(self.store.key(self.image), key)
+        self.assertTrue(key.startswith(self.store.directory + os.sep))
+
+    def test_changed_file(self):
+        key = self.store.key(self.image)
+        os.utime(self.image, ns=(0, 1))
+
+        self.assertNotEqual(self.store.key(self.image), key)
+
+    def test_size(self):
+        other = ThumbnailStore(self.store.directory, size=(128, 128))
+
+        self.assertNotEqual(other.key(self.image), self.store.key(self.image))
+
+    def test_missing_file(self):
+        self.assertIsNone(self.store.key(os.path.join(self.temporary.name, 'missing.png')))
+
+    def test_archive_member(self):
+        archive = os.path.join(self.temporary.name, 'comic.cbz')
+
+        with zipfile.ZipFile(archive, 'w') as file:
+            file.writestr('01.png', b'')
+
+        member = os.path.join(archive, '01.png')
+        key = self.store.key(member)
+        self.assertIsNotNone(key)
+
+        # Keyed on the archive
+        os.utime(archive, ns=(0, 1))
+        self.assertNotEqual(self.store.key(member), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+HttpSource Against A Local http.server
+"""
+
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import HttpSource, image_pattern  # pylint: disable=wrong-import-position
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    """
+    Keep-Alive File Server Handler Recording (path, status) Of Every Request
+    """
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def log_request(self, code='-', size='-'):
+        self.requests.append((self.path, int(code)))
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class HttpSourceTest(unittest.TestCase):
+    """
+    Listing, Fetching And Revalidation
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.served = os.path.join(self.temporary.name, 'served')
+        os.makedirs(os.path.join(self.served, 'subdirectory'))
+
+        for name, content in (('image10.png', b'ten'), ('image2.png', b'two'),
+                              ('.hidden.png', b'hidden'), ('notes.txt', b'text')):
+            with open(os.path.join(self.served, name), 'wb') as file:
+                file.write(content)
+
+        RecordingHandler.requests = []
+        self.server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), functools.partial(RecordingHandler, directory=self.served))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.source = HttpSource(os.path.join(self.temporary.name, 'cache'))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.temporary.cleanup()
+
+    def test_listing(self):
+        urls = self.source.listing(self.url, image_pattern())
+
+        self.assertEqual(sorted(urls), [self.url + 'image10.png', self.url + 'image2.png'])
+
+    def test_fetch(self):
+        cached = self.source.fetch(self.url + 'image2.png')
+
+        with open(cached, 'rb') as file:
+            self.assertEqual(file.read(), b'two')
+
+        # Fresh for the rest of the run, served from disk
+        self.assertEqual(self.source.fetch(self.url + 'image2.png'), cached)
+        self.assertEqual(RecordingHandler.requests, [('/image2.png', 200)])
+
+    def test_revalidation(self):
+        url = self.url + 'image2.png'
+        cached = self.source.fetch(url)
+
+        # A new run revalidates with If-Modified-Since
+        self.source.fresh.clear()
+        self.assertEqual(self.source.fetch(url), cached)
+        self.assertEqual(RecordingHandler.requests[-1], ('/image2.png', 304))
+
+        # Changed on the server, downloaded again
+        time.sleep(1.1)
+        with open(os.path.join(self.served, 'image2.png'), 'wb') as file:
+            file.write(b'changed')
+
+        self.source.fresh.clear()
+
+        with open(self.source.fetch(url), 'rb') as file:
+            self.assertEqual(file.read(), b'changed')
+        self.assertEqual(RecordingHandler.requests[-1], ('/image2.png', 200))
+
+    def test_keep_alive(self):
+        for name in ('image2.png', 'image10.png'):
+            self.source.fetch(self.url + name)
+
+        self.assertEqual(len(self.source.idle[('http', f'127.0.0.1:{self.server.server_port}')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()